@@ -0,0 +1,183 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import time
+from demoparser2 import DemoParser
+from awpy.visibility import VisibilityChecker
+from awpy.data import TRIS_DIR
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from demolib.archives import demo_key, find_demo, local_demo
+from demolib.bootstrap import compare_groups, format_comparison
+from demolib.engagements import worker_pool
+from demolib.frames import active_ticks as active_ticks_for
+from demolib.pvs import PVSGrid, PVSVisibility, pvs_grid_path
+from demolib.schema import load_ticks, memory_report
+from demolib.sweep import SWEEP_PROPS, sweep_match
+from demolib.tables import write_table
+
+BASE_PATH = r"F:\steam\steamapps\common\Counter-Strike Global Offensive\game\csgo\replays"
+
+DEMOS_AND_PLAYERS = [
+    ("match730_003784446263911514537_1478082598_187.dem", 76561198262157518, "arckay."),
+    ("match730_003784108645122310500_1981615639_411.dem", 76561198155980865, "KosyaK"),
+    ("match730_003783868685299483229_2047292477_192.dem", 76561198962223770, "patsan"),
+    ("match730_003788960304604381265_2009075138_192.dem", 76561198155980865, "KosyaK"),
+    ("match730_003788558291370508879_1730936726_187.dem", 76561198155980865, "KosyaK"),
+    ("match730_003790222312024835007_0827502415_272.dem", 76561198816184658, "Unknown"),
+    ("match730_003790275752155414789_0281693499_411.dem", 76561198816184658, "Unknown"),
+    ("match730_003790277747167723523_2066055668_187.dem", 76561198816184658, "Unknown"),
+    ("match730_003790301240638832694_0587072542_186.dem", 76561198816184658, "Unknown"),
+]
+
+CSV_OUTPUT = "visibility_onset_comparison.csv"
+TICK_RATE = 64
+MOVE_THRESHOLD = 16.0  # units either player may move before the pair is raycast again
+MAX_STALE_TICKS = 64
+FOV_HALF_ANGLE = 45.0
+PREAIM_ANGLE = 5.0  # crosshair already this close to the enemy when they come into view
+SWEEP_WORKERS = 1  # worker processes for the run; each demo's batch of rays is split between them
+PVS_PREFILTER = False
+PVS_VERIFY = False
+WRITE_TABLES = True
+GAME_STATE_FLAGS = ["is_freeze_period", "is_warmup_period", "is_terrorist_timeout", "is_ct_timeout", "is_technical_timeout", "is_waiting_for_resume"]
+
+TRACKED_STEAMIDS = set([76561198262157518, 76561198155980865, 76561198962223770, 76561198816184658])
+
+def group_summary(group, onsets_df):
+    visible_ms = (onsets_df['end_tick'] - onsets_df['tick'] + 1) / TICK_RATE * 1000
+    view_angle = onsets_df['view_angle'].astype(np.float64)
+    return {
+        'group': group,
+        'total_onsets': len(onsets_df),
+        'avg_view_angle': view_angle.mean(),
+        'median_view_angle': view_angle.median(),
+        'preaim_ratio': (view_angle <= PREAIM_ANGLE).mean(),
+        'mutual_ratio': onsets_df['mutual'].mean(),
+        'median_visible_ms': visible_ms.median(),
+        'avg_distance': onsets_df['distance'].astype(np.float64).mean()
+    }
+
+def main():
+    all_onsets = []
+    total_pair_ticks = 0
+    total_raycasts = 0
+    pool = worker_pool(SWEEP_WORKERS)
+    
+    for demo_file, tracked_steamid, player_name in DEMOS_AND_PLAYERS:
+        demo_path = find_demo(os.path.join(BASE_PATH, demo_file))
+        
+        if demo_path is None:
+            print(f"Warning: {demo_file} not found, skipping...")
+            continue
+        
+        print(f"\n{'='*60}")
+        print(f"Processing {demo_file}...")
+        print(f"{'='*60}")
+        
+        try:
+            parser = DemoParser(local_demo(demo_path))
+            
+            header = parser.parse_header()
+            map_name = header.get("map_name")
+            
+            tri_path = TRIS_DIR / f"{map_name}.tri"
+            
+            if not tri_path.exists():
+                print(f"  Warning: .tri file for {map_name} not found, skipping...")
+                continue
+            
+            print(f"  Parsing game state...")
+            game_state_df = load_ticks(parser, GAME_STATE_FLAGS)
+            # warmup shares total_rounds_played 0 with the first round, so it has to go before rounds are split
+            active_ticks = active_ticks_for(game_state_df, GAME_STATE_FLAGS)
+            print(f"  Active ticks: {len(active_ticks)} out of {len(game_state_df['tick'].unique())}")
+            del game_state_df
+            
+            print(f"  Parsing ticks...")
+            tick_df = load_ticks(parser, SWEEP_PROPS, ticks=active_ticks)
+            print(f"  {memory_report(tick_df)}")
+            
+            print(f"  Initializing raycasting for {map_name}...")
+            vc = VisibilityChecker(path=tri_path)
+            
+            if PVS_PREFILTER:
+                grid_path = pvs_grid_path(map_name)
+                if os.path.exists(grid_path):
+                    vc = PVSVisibility(vc, PVSGrid(grid_path), verify=PVS_VERIFY)
+                else:
+                    print(f"  Warning: no PVS grid for {map_name}, run build_pvs.py first")
+            
+            print(f"  Sweeping enemy pairs over {tick_df['total_rounds_played'].nunique()} rounds...")
+            sweep_start = time.perf_counter()
+            onsets_df, pair_ticks, raycasts = sweep_match(
+                tick_df, vc, tri_path=tri_path, pool=pool,
+                move_threshold=MOVE_THRESHOLD, max_stale_ticks=MAX_STALE_TICKS, fov_half_angle=FOV_HALF_ANGLE
+            )
+            sweep_seconds = time.perf_counter() - sweep_start
+            del tick_df
+            
+            print(f"  Visibility onsets: {len(onsets_df)} in {sweep_seconds:.1f}s")
+            if pair_ticks:
+                print(f"  Raycasts: {raycasts} for {pair_ticks} enemy pair ticks ({1 - raycasts / pair_ticks:.1%} reused from the last check, "
+                      f"{onsets_df.attrs['scheduled_rays'] - raycasts} duplicate rays skipped)")
+            total_pair_ticks += pair_ticks
+            total_raycasts += raycasts
+            
+            if len(onsets_df) == 0:
+                continue
+            
+            if WRITE_TABLES:
+                write_table("visibility_onsets", onsets_df, demo_key(demo_path), map_name)
+            
+            onsets_df['is_tracked'] = onsets_df['observer_steamid'].isin(TRACKED_STEAMIDS)
+            all_onsets.append(onsets_df)
+        
+        except Exception as e:
+            print(f"  Error processing {demo_file}: {e}")
+            continue
+    
+    if pool is not None:
+        pool.shutdown()
+    
+    if not all_onsets:
+        print("\nNo visibility onsets collected!")
+        return
+    
+    print(f"\n{'='*60}")
+    print("AGGREGATING RESULTS...")
+    print(f"{'='*60}")
+    print(f"Raycasts: {total_raycasts} for {total_pair_ticks} enemy pair ticks")
+    
+    onsets_df = pd.concat(all_onsets, ignore_index=True)
+    tracked_df = onsets_df[onsets_df['is_tracked']]
+    other_df = onsets_df[~onsets_df['is_tracked']]
+    
+    comparison_data = []
+    if len(tracked_df):
+        comparison_data.append(group_summary('Tracked Players', tracked_df))
+    if len(other_df):
+        comparison_data.append(group_summary('Other Players', other_df))
+    
+    comparison_df = pd.DataFrame(comparison_data)
+    comparison_df = comparison_df.round(3)
+    
+    comparison_df.to_csv(CSV_OUTPUT, index=False)
+    
+    print(f"\nVisibility onset comparison saved to {CSV_OUTPUT}")
+    print(f"\n{'='*60}")
+    print("VIEW ANGLE AT VISIBILITY ONSET")
+    print(f"{'='*60}\n")
+    print(comparison_df.to_string(index=False))
+    
+    if len(comparison_df) == 2:
+        print(f"\n{'='*60}")
+        print("SIGNIFICANCE (bootstrap CI, permutation test):")
+        print(f"{'='*60}")
+        for statistic in ("mean", "median"):
+            result = compare_groups(tracked_df['view_angle'].astype(np.float64), other_df['view_angle'].astype(np.float64), statistic)
+            print(format_comparison("View angle difference", result, " deg"))
+
+if __name__ == "__main__":
+    main()
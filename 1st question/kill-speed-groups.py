@@ -1,10 +1,23 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
+import time
 from demoparser2 import DemoParser
 from awpy.visibility import VisibilityChecker
 from awpy.data import TRIS_DIR
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from demolib.archives import demo_key, find_demo, local_demo
+from demolib.bootstrap import compare_groups, format_comparison
+from demolib.engagements import analyze_kills_sharded, kill_list, worker_pool
+from demolib.prefetch import prefetch_demos
+from demolib.profiles import ProfileStore, steamid_key
+from demolib.pvs import PVSGrid, PVSVisibility, pvs_grid_path
+from demolib.schema import load_ticks, memory_report
+from demolib.ticks import parse_ticks_windowed
+from demolib.tickstore import TickStore, build_tick_store, tick_store_path
+
 BASE_PATH = r"F:\steam\steamapps\common\Counter-Strike Global Offensive\game\csgo\replays"
 
 DEMOS_AND_PLAYERS = [
@@ -22,6 +35,20 @@ DEMOS_AND_PLAYERS = [
 CSV_OUTPUT = "kill_speed_comparison.csv"
 TICK_RATE = 64
 LOOKBACK_WINDOW_SECONDS = 3.0
+SPOTTED_SEARCH = "linear"  # "linear", "exponential" or "stride"
+SPOTTED_SEARCH_STRICT = False
+WINDOWED_TICKS = True
+BOOTSTRAP_WORKERS = 1
+KILL_SHARDS = 1  # worker processes shared by every demo in the run, e.g. os.cpu_count()
+PVS_PREFILTER = False  # answer clear-cut cell pairs from the grid built by build_pvs.py
+PVS_VERIFY = False  # still raycast every query and count where the grid disagreed; counts add up towards the grid's trust
+UPDATE_PROFILES = True
+# only exact spotted ticks go into the persistent profiles: a record can never be replaced
+# once its demo is marked processed, so approximate search is not recorded, and PVS answers
+# only count as exact when verified or from a grid that verify runs found no fault in
+EXACT_SEARCH = SPOTTED_SEARCH == "linear" or SPOTTED_SEARCH_STRICT
+PREFETCH_DEPTH = 2  # demos read ahead of the one being parsed
+PREFETCH_BUDGET_BYTES = 2 * 1024 ** 3
 MAX_KILL_SPEED_TICKS = 150
 
 TRACKED_STEAMIDS = set([float(76561198262157518), float(76561198155980865), float(76561198962223770), float(76561198816184658)])
@@ -29,11 +56,19 @@ TRACKED_STEAMIDS = set([float(76561198262157518), float(76561198155980865), floa
 def main():
     all_tracked_kills = []
     all_other_kills = []
+    profiles = ProfileStore() if UPDATE_PROFILES and EXACT_SEARCH else None
+    if UPDATE_PROFILES and not EXACT_SEARCH:
+        print("Profiles: not updated, spotted ticks are approximate with this search setting")
+    # started before the prefetch thread so workers can be forked safely
+    pool = worker_pool(KILL_SHARDS)
+    
+    prefetcher = prefetch_demos([os.path.join(BASE_PATH, demo_file) for demo_file, _, _ in DEMOS_AND_PLAYERS], PREFETCH_DEPTH, PREFETCH_BUDGET_BYTES)
+    run_start = time.perf_counter()
     
     for demo_file, tracked_steamid, player_name in DEMOS_AND_PLAYERS:
-        demo_path = os.path.join(BASE_PATH, demo_file)
+        demo_path = find_demo(os.path.join(BASE_PATH, demo_file))
         
-        if not os.path.exists(demo_path):
+        if demo_path is None:
             print(f"Warning: {demo_file} not found, skipping...")
             continue
         
@@ -41,15 +76,29 @@ def main():
         print(f"Processing {demo_file}...")
         print(f"{'='*60}")
         
+        prefetcher.wait(demo_path)
+        print(f"  {prefetcher.report(demo_path)}")
+        
         try:
-            parser = DemoParser(demo_path)
-            
-            tick_df = parser.parse_ticks(["X", "Y", "Z", "is_alive", "name"])
-            tick_df = pd.DataFrame(tick_df)
-            tick_df = tick_df[tick_df['is_alive'] == True].sort_values(by=['steamid', 'tick'])
+            parser = DemoParser(local_demo(demo_path))
             
             kills_df = pd.DataFrame(parser.parse_event("player_death"))
             
+            lookback_ticks = int(LOOKBACK_WINDOW_SECONDS * TICK_RATE)
+            store_path = tick_store_path(demo_key(demo_path), lookback_ticks if WINDOWED_TICKS else None)
+            
+            if os.path.exists(store_path):
+                print(f"  Opening cached tick store...")
+                store = TickStore(store_path)
+            else:
+                if WINDOWED_TICKS:
+                    tick_df = parse_ticks_windowed(parser, ["X", "Y", "Z", "is_alive", "name"], kills_df.get('tick', []), lookback_ticks)
+                else:
+                    tick_df = load_ticks(parser, ["X", "Y", "Z", "is_alive", "name"])
+                print(f"  {memory_report(tick_df)}")
+                store = build_tick_store(tick_df[tick_df['is_alive'] == True], store_path)
+                del tick_df
+            
             header = parser.parse_header()
             map_name = header.get("map_name")
             
@@ -62,45 +111,37 @@ def main():
             print(f"  Initializing raycasting for {map_name}...")
             vc = VisibilityChecker(path=tri_path)
             
+            if PVS_PREFILTER:
+                grid_path = pvs_grid_path(map_name)
+                if os.path.exists(grid_path):
+                    vc = PVSVisibility(vc, PVSGrid(grid_path), verify=PVS_VERIFY)
+                else:
+                    print(f"  Warning: no PVS grid for {map_name}, run build_pvs.py first")
+            
             print(f"  Processing {len(kills_df)} kills...")
             
-            tick_df['steamid'] = tick_df['steamid'].astype(float)
-            ticks_indexed = tick_df.set_index(['tick', 'steamid']).sort_index()
+            kills = kill_list(kills_df)
             
-            for _, kill in kills_df.iterrows():
-                attacker_id = float(kill.get('attacker_steamid', 0))
-                victim_id = float(kill.get('user_steamid', 0))
-                kill_tick = int(kill.get('tick', 0))
-                
-                if not attacker_id or not victim_id or attacker_id == victim_id:
-                    continue
-                
-                start_search_tick = kill_tick - int(LOOKBACK_WINDOW_SECONDS * TICK_RATE)
-                
-                try:
-                    window_slice = ticks_indexed.loc[start_search_tick:kill_tick]
-                    att_hist = window_slice.xs(attacker_id, level='steamid')
-                    vic_hist = window_slice.xs(victim_id, level='steamid')
-                except KeyError:
-                    continue
-                
-                merged = pd.merge(att_hist, vic_hist, on='tick', suffixes=('_att', '_vic'), how='inner').sort_index(ascending=False)
-                
-                spotted_tick = kill_tick
-                
-                for tick, row in merged.iterrows():
-                    p1 = (row['X_att'], row['Y_att'], row['Z_att'] + 64)
-                    p2 = (row['X_vic'], row['Y_vic'], row['Z_vic'] + 64)
-                    
-                    is_visible = vc.is_visible(p1, p2)
-                    
-                    if not is_visible:
-                        spotted_tick = tick + 1
-                        break
-                    
-                    spotted_tick = tick
+            if KILL_SHARDS > 1:
+                print(f"  Sharding kills across {KILL_SHARDS} worker processes...")
+            engagements = analyze_kills_sharded(
+                kills, store, tri_path, lookback_ticks, KILL_SHARDS,
+                strategy=SPOTTED_SEARCH, strict=SPOTTED_SEARCH_STRICT, vc=vc, pool=pool
+            )
+            
+            demo_raycasts = 0
+            demo_linear_raycasts = 0
+            demo_avoided = 0
+            demo_mismatches = 0
+            demo_samples = {}
+            
+            for engagement in engagements:
+                demo_raycasts += engagement['raycasts']
+                demo_linear_raycasts += engagement['linear_raycasts']
+                demo_avoided += engagement['raycasts_avoided']
+                demo_mismatches += engagement['pvs_mismatches']
                 
-                kill_speed_ticks = kill_tick - spotted_tick
+                kill_speed_ticks = engagement['tick'] - engagement['spotted_tick']
                 
                 if kill_speed_ticks > MAX_KILL_SPEED_TICKS:
                     continue
@@ -112,17 +153,44 @@ def main():
                     'kill_speed_ticks': kill_speed_ticks
                 }
                 
-                if attacker_id in TRACKED_STEAMIDS:
+                attacker = steamid_key(engagement['attacker_steamid'])
+                if attacker is not None:
+                    demo_samples.setdefault(attacker, {'kill_speed_ms': []})['kill_speed_ms'].append(kill_speed_ms)
+                
+                if engagement['attacker_id'] in TRACKED_STEAMIDS:
                     all_tracked_kills.append(kill_data)
                 else:
                     all_other_kills.append(kill_data)
             
             print(f"  Tracked players kills: {len([k for k in all_tracked_kills if k])} | Other players kills: {len([k for k in all_other_kills if k])}")
+            print(f"  Raycasts ({SPOTTED_SEARCH}): {demo_raycasts} | Linear scan: {demo_linear_raycasts} | Saved: {demo_linear_raycasts - demo_raycasts}")
+            if isinstance(vc, PVSVisibility) and demo_raycasts:
+                print(f"  PVS prefilter: {demo_avoided} of {demo_raycasts} visibility checks without a raycast ({demo_avoided / demo_raycasts:.1%})")
+                if PVS_VERIFY:
+                    verified = vc.grid.record_verification(demo_avoided, demo_mismatches)
+                    print(f"  PVS grid disagreed with the raycast on {demo_mismatches} of {demo_avoided} checks "
+                          f"({verified['mismatches']} of {verified['checks']} so far, {'trusted' if vc.grid.trusted else 'not trusted'})")
+            
+            exact = not isinstance(vc, PVSVisibility) or vc.verify or vc.grid.trusted
+            if profiles is not None and not exact:
+                print(f"  Profiles: not updated, the PVS grid for {map_name} is not trusted yet (verify it with PVS_VERIFY)")
+            elif profiles is not None:
+                if profiles.record_demo(demo_file, "kill_speed", samples=demo_samples):
+                    print(f"  Profiles: updated {len(demo_samples)} players")
+                else:
+                    print(f"  Profiles: {demo_file} already recorded")
             
         except Exception as e:
             print(f"  Error processing {demo_file}: {e}")
             continue
     
+    prefetcher.close()
+    if pool is not None:
+        pool.shutdown()
+    if profiles is not None:
+        profiles.close()
+    print(f"\n{prefetcher.summary(time.perf_counter() - run_start)}")
+    
     if not all_tracked_kills and not all_other_kills:
         print("\nNo kill data collected!")
         return
@@ -179,6 +247,13 @@ def main():
         print(f"{'='*60}")
         print(f"Average kill speed difference: {diff_avg:.2f} ms")
         print(f"Median kill speed difference: {diff_median:.2f} ms")
+        
+        print(f"\n{'='*60}")
+        print("SIGNIFICANCE (bootstrap CI, permutation test):")
+        print(f"{'='*60}")
+        for statistic in ("mean", "median"):
+            result = compare_groups(tracked_df['kill_speed_ms'], other_df['kill_speed_ms'], statistic, workers=BOOTSTRAP_WORKERS)
+            print(format_comparison("Kill speed difference", result, " ms"))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,12 +1,25 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 from demoparser2 import DemoParser
 from awpy.visibility import VisibilityChecker
 from awpy.data import TRIS_DIR
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from demolib.archives import demo_key, find_demo, local_demo
+from demolib.bootstrap import compare_groups, format_comparison
+from demolib.engagements import analyze_kills_sharded, fire_ticks_by_player, kill_list, worker_pool
+from demolib.profiles import ProfileStore, steamid_key
+from demolib.pvs import PVSGrid, PVSVisibility, pvs_grid_path
+from demolib.schema import load_ticks, memory_report
+from demolib.ticks import parse_ticks_windowed
+from demolib.tickstore import TickStore, build_tick_store, tick_store_path
+from demolib.tables import write_table
+from demolib.stats import RunningStats, mean_diff_ci
+
 BASE_PATH = r"F:\steam\steamapps\common\Counter-Strike Global Offensive\game\csgo\replays"
 
 DEMOS_AND_PLAYERS = [
@@ -22,10 +35,28 @@ DEMOS_AND_PLAYERS = [
 ]
 
 CSV_OUTPUT = "reaction_speed_comparison.csv"
+PROGRESS_OUTPUT = "reaction_speed_progress.csv"
 TICK_RATE = 64
 LOOKBACK_WINDOW_SECONDS = 3.0
+SPOTTED_SEARCH = "linear"  # "linear", "exponential" or "stride"
+SPOTTED_SEARCH_STRICT = False
+WINDOWED_TICKS = True
+BOOTSTRAP_WORKERS = 1
+KILL_SHARDS = 1  # worker processes shared by every demo in the run, e.g. os.cpu_count()
+PVS_PREFILTER = False  # answer clear-cut cell pairs from the grid built by build_pvs.py
+PVS_VERIFY = False  # still raycast every query and count where the grid disagreed; counts add up towards the grid's trust
+WRITE_TABLES = True
+UPDATE_PROFILES = True
+# only exact spotted ticks go into the persistent profiles: a record can never be replaced
+# once its demo is marked processed, so approximate search is not recorded, and PVS answers
+# only count as exact when verified or from a grid that verify runs found no fault in
+EXACT_SEARCH = SPOTTED_SEARCH == "linear" or SPOTTED_SEARCH_STRICT
 MAX_REACTION_TICKS = 200
 
+EARLY_STOP = False
+EARLY_STOP_MIN_DEMOS = 3
+EARLY_STOP_Z = 3.29  # stricter than 1.96 because the interval is checked after every demo
+
 TRACKED_STEAMIDS = set([float(76561198262157518), float(76561198155980865), float(76561198962223770), float(76561198816184658)])
 
 print_lock = Lock()
@@ -34,10 +65,10 @@ def safe_print(msg):
     with print_lock:
         print(msg)
 
-def process_demo(demo_file, tracked_steamid, player_name):
-    demo_path = os.path.join(BASE_PATH, demo_file)
+def process_demo(demo_file, tracked_steamid, player_name, pool=None):
+    demo_path = find_demo(os.path.join(BASE_PATH, demo_file))
     
-    if not os.path.exists(demo_path):
+    if demo_path is None:
         safe_print(f"Warning: {demo_file} not found, skipping...")
         return None, None
     
@@ -46,14 +77,25 @@ def process_demo(demo_file, tracked_steamid, player_name):
     safe_print(f"{'='*60}")
     
     try:
-        parser = DemoParser(demo_path)
-        
-        tick_df = parser.parse_ticks(["X", "Y", "Z", "is_alive", "name"])
-        tick_df = pd.DataFrame(tick_df)
-        tick_df = tick_df[tick_df['is_alive'] == True].sort_values(by=['steamid', 'tick'])
+        parser = DemoParser(local_demo(demo_path))
         
         kills_df = pd.DataFrame(parser.parse_event("player_death"))
         
+        lookback_ticks = int(LOOKBACK_WINDOW_SECONDS * TICK_RATE)
+        store_path = tick_store_path(demo_key(demo_path), lookback_ticks if WINDOWED_TICKS else None)
+        
+        if os.path.exists(store_path):
+            safe_print(f"  Opening cached tick store...")
+            store = TickStore(store_path)
+        else:
+            if WINDOWED_TICKS:
+                tick_df = parse_ticks_windowed(parser, ["X", "Y", "Z", "is_alive", "name"], kills_df.get('tick', []), lookback_ticks)
+            else:
+                tick_df = load_ticks(parser, ["X", "Y", "Z", "is_alive", "name"])
+            safe_print(f"  {memory_report(tick_df)}")
+            store = build_tick_store(tick_df[tick_df['is_alive'] == True], store_path)
+            del tick_df
+        
         safe_print(f"  Parsing weapon fires...")
         fires_df = pd.DataFrame(parser.parse_event("weapon_fire"))
         
@@ -69,66 +111,43 @@ def process_demo(demo_file, tracked_steamid, player_name):
         safe_print(f"  Initializing raycasting for {map_name}...")
         vc = VisibilityChecker(path=tri_path)
         
+        if PVS_PREFILTER:
+            grid_path = pvs_grid_path(map_name)
+            if os.path.exists(grid_path):
+                vc = PVSVisibility(vc, PVSGrid(grid_path), verify=PVS_VERIFY)
+            else:
+                safe_print(f"  Warning: no PVS grid for {map_name}, run build_pvs.py first")
+        
         safe_print(f"  Processing {len(kills_df)} kills...")
         
-        tick_df['steamid'] = tick_df['steamid'].astype(float)
-        ticks_indexed = tick_df.set_index(['tick', 'steamid']).sort_index()
+        kills = kill_list(kills_df)
+        fires = fire_ticks_by_player(fires_df)
         
-        fires_df['user_steamid'] = fires_df['user_steamid'].astype(float)
-        fires_indexed = fires_df.set_index(['tick', 'user_steamid']).sort_index()
+        if KILL_SHARDS > 1:
+            safe_print(f"  Sharding kills across {KILL_SHARDS} worker processes...")
+        engagements = analyze_kills_sharded(
+            kills, store, tri_path, lookback_ticks, KILL_SHARDS, fires=fires,
+            strategy=SPOTTED_SEARCH, strict=SPOTTED_SEARCH_STRICT, vc=vc, pool=pool
+        )
         
         tracked_reactions = []
         other_reactions = []
+        demo_raycasts = 0
+        demo_linear_raycasts = 0
+        demo_avoided = 0
+        demo_mismatches = 0
+        demo_samples = {}
         
-        for _, kill in kills_df.iterrows():
-            attacker_id = float(kill.get('attacker_steamid', 0))
-            victim_id = float(kill.get('user_steamid', 0))
-            kill_tick = int(kill.get('tick', 0))
-            
-            if not attacker_id or not victim_id or attacker_id == victim_id:
-                continue
-            
-            start_search_tick = kill_tick - int(LOOKBACK_WINDOW_SECONDS * TICK_RATE)
-            
-            try:
-                window_slice = ticks_indexed.loc[start_search_tick:kill_tick]
-                att_hist = window_slice.xs(attacker_id, level='steamid')
-                vic_hist = window_slice.xs(victim_id, level='steamid')
-            except KeyError:
-                continue
-            
-            merged = pd.merge(att_hist, vic_hist, on='tick', suffixes=('_att', '_vic'), how='inner').sort_index(ascending=False)
-            
-            spotted_tick = kill_tick
-            
-            for tick, row in merged.iterrows():
-                p1 = (row['X_att'], row['Y_att'], row['Z_att'] + 64)
-                p2 = (row['X_vic'], row['Y_vic'], row['Z_vic'] + 64)
-                
-                is_visible = vc.is_visible(p1, p2)
-                
-                if not is_visible:
-                    spotted_tick = tick + 1
-                    break
-                
-                spotted_tick = tick
+        for engagement in engagements:
+            demo_raycasts += engagement['raycasts']
+            demo_linear_raycasts += engagement['linear_raycasts']
+            demo_avoided += engagement['raycasts_avoided']
+            demo_mismatches += engagement['pvs_mismatches']
             
-            try:
-                attacker_fires = fires_indexed.xs(attacker_id, level='user_steamid')
-                first_shot_after_visible = attacker_fires[
-                    (attacker_fires.index >= spotted_tick) & 
-                    (attacker_fires.index <= kill_tick)
-                ]
-                
-                if first_shot_after_visible.empty:
-                    continue
-                    
-                first_shot_tick = first_shot_after_visible.index.min()
-                
-            except KeyError:
+            if engagement['first_shot_tick'] is None:
                 continue
             
-            reaction_ticks = first_shot_tick - spotted_tick
+            reaction_ticks = engagement['first_shot_tick'] - engagement['spotted_tick']
             
             if reaction_ticks > MAX_REACTION_TICKS or reaction_ticks < 0:
                 continue
@@ -140,12 +159,39 @@ def process_demo(demo_file, tracked_steamid, player_name):
                 'reaction_ticks': reaction_ticks
             }
             
-            if attacker_id in TRACKED_STEAMIDS:
+            attacker = steamid_key(engagement['attacker_steamid'])
+            if attacker is not None:
+                demo_samples.setdefault(attacker, {'reaction_ms': []})['reaction_ms'].append(reaction_time_ms)
+            
+            if engagement['attacker_id'] in TRACKED_STEAMIDS:
                 tracked_reactions.append(reaction_data)
             else:
                 other_reactions.append(reaction_data)
         
+        if WRITE_TABLES and engagements:
+            engagements_df = pd.DataFrame(engagements)[['attacker_steamid', 'victim_steamid', 'tick', 'spotted_tick', 'first_shot_tick']]
+            engagements_df['first_shot_tick'] = engagements_df['first_shot_tick'].astype("Int64")
+            write_table("engagements", engagements_df, demo_key(demo_path), map_name)
+        
         safe_print(f"  Tracked reactions: {len(tracked_reactions)} | Other reactions: {len(other_reactions)}")
+        safe_print(f"  Raycasts ({SPOTTED_SEARCH}): {demo_raycasts} | Linear scan: {demo_linear_raycasts} | Saved: {demo_linear_raycasts - demo_raycasts}")
+        if isinstance(vc, PVSVisibility) and demo_raycasts:
+            safe_print(f"  PVS prefilter: {demo_avoided} of {demo_raycasts} visibility checks without a raycast ({demo_avoided / demo_raycasts:.1%})")
+            if PVS_VERIFY:
+                verified = vc.grid.record_verification(demo_avoided, demo_mismatches)
+                safe_print(f"  PVS grid disagreed with the raycast on {demo_mismatches} of {demo_avoided} checks "
+                           f"({verified['mismatches']} of {verified['checks']} so far, {'trusted' if vc.grid.trusted else 'not trusted'})")
+        
+        exact = not isinstance(vc, PVSVisibility) or vc.verify or vc.grid.trusted
+        if UPDATE_PROFILES and EXACT_SEARCH and not exact:
+            safe_print(f"  Profiles: not updated, the PVS grid for {map_name} is not trusted yet (verify it with PVS_VERIFY)")
+        elif UPDATE_PROFILES and EXACT_SEARCH:
+            # one connection per worker thread; sqlite serialises the writes
+            with ProfileStore() as profiles:
+                if profiles.record_demo(demo_file, "reaction", samples=demo_samples):
+                    safe_print(f"  Profiles: updated {len(demo_samples)} players")
+                else:
+                    safe_print(f"  Profiles: {demo_file} already recorded")
         
         return tracked_reactions, other_reactions
         
@@ -153,25 +199,78 @@ def process_demo(demo_file, tracked_steamid, player_name):
         safe_print(f"  Error processing {demo_file}: {e}")
         return None, None
 
+def report_progress(demos_done, tracked_stats, other_stats, progress_rows):
+    tracked_low, tracked_high = tracked_stats.ci()
+    other_low, other_high = other_stats.ci()
+    diff, diff_low, diff_high = mean_diff_ci(tracked_stats, other_stats)
+    _, settled_low, settled_high = mean_diff_ci(tracked_stats, other_stats, z=EARLY_STOP_Z)
+    
+    safe_print(f"\n[{demos_done}/{len(DEMOS_AND_PLAYERS)} demos] "
+               f"Tracked: n={tracked_stats.n} mean={tracked_stats.mean:.2f} ms (95% CI {tracked_low:.2f} to {tracked_high:.2f}) | "
+               f"Other: n={other_stats.n} mean={other_stats.mean:.2f} ms (95% CI {other_low:.2f} to {other_high:.2f}) | "
+               f"Diff: {diff:.2f} ms (95% CI {diff_low:.2f} to {diff_high:.2f})")
+    
+    progress_rows.append({
+        'demos_done': demos_done,
+        'tracked_n': tracked_stats.n,
+        'tracked_mean_ms': tracked_stats.mean,
+        'tracked_ci_low': tracked_low,
+        'tracked_ci_high': tracked_high,
+        'other_n': other_stats.n,
+        'other_mean_ms': other_stats.mean,
+        'other_ci_low': other_low,
+        'other_ci_high': other_high,
+        'diff_ms': diff,
+        'diff_ci_low': diff_low,
+        'diff_ci_high': diff_high
+    })
+    pd.DataFrame(progress_rows).round(2).to_csv(PROGRESS_OUTPUT, index=False)
+    
+    return settled_low > 0 or settled_high < 0
+
 def main():
     all_tracked_reactions = []
     all_other_reactions = []
     
+    tracked_stats = RunningStats()
+    other_stats = RunningStats()
+    progress_rows = []
+    demos_done = 0
+    
     safe_print(f"Processing {len(DEMOS_AND_PLAYERS)} demos using multithreading...\n")
     
+    if UPDATE_PROFILES and not EXACT_SEARCH:
+        safe_print("Profiles: not updated, spotted ticks are approximate with this search setting\n")
+    
+    # started before the demo threads so workers can be forked safely
+    pool = worker_pool(KILL_SHARDS)
+    
     with ThreadPoolExecutor(max_workers=4) as executor:
         future_to_demo = {
-            executor.submit(process_demo, demo_file, steamid, name): demo_file 
+            executor.submit(process_demo, demo_file, steamid, name, pool): demo_file 
             for demo_file, steamid, name in DEMOS_AND_PLAYERS
         }
         
         for future in as_completed(future_to_demo):
             tracked_reactions, other_reactions = future.result()
+            demos_done += 1
             
             if tracked_reactions:
                 all_tracked_reactions.extend(tracked_reactions)
+                tracked_stats.update(r['reaction_time_ms'] for r in tracked_reactions)
             if other_reactions:
                 all_other_reactions.extend(other_reactions)
+                other_stats.update(r['reaction_time_ms'] for r in other_reactions)
+            
+            settled = report_progress(demos_done, tracked_stats, other_stats, progress_rows)
+            
+            if EARLY_STOP and settled and demos_done >= EARLY_STOP_MIN_DEMOS and demos_done < len(future_to_demo):
+                safe_print(f"\nDifference settled at z={EARLY_STOP_Z} after {demos_done} demos, cancelling the remaining demos...")
+                executor.shutdown(wait=False, cancel_futures=True)
+                break
+    
+    if pool is not None:
+        pool.shutdown()
     
     if not all_tracked_reactions and not all_other_reactions:
         safe_print("\nNo reaction data collected!")
@@ -229,6 +328,13 @@ def main():
         safe_print(f"{'='*60}")
         safe_print(f"Average reaction speed difference: {diff_avg:.2f} ms")
         safe_print(f"Median reaction speed difference: {diff_median:.2f} ms")
+        
+        safe_print(f"\n{'='*60}")
+        safe_print("SIGNIFICANCE (bootstrap CI, permutation test):")
+        safe_print(f"{'='*60}")
+        for statistic in ("mean", "median"):
+            result = compare_groups(tracked_df['reaction_time_ms'], other_df['reaction_time_ms'], statistic, workers=BOOTSTRAP_WORKERS)
+            safe_print(format_comparison("Reaction speed difference", result, " ms"))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
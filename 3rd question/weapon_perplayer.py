@@ -1,7 +1,17 @@
 import pandas as pd
 import os
+import sys
+import time
 from demoparser2 import DemoParser
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from demolib.archives import find_demo, local_demo
+from demolib.bootstrap import compare_groups, format_comparison
+from demolib.frames import weapon_usage
+from demolib.prefetch import prefetch_demos
+from demolib.profiles import ProfileStore
+from demolib.runs import load_runs, runs_report
+
 BASE_PATH = r"F:\steam\steamapps\common\Counter-Strike Global Offensive\game\csgo\replays"
 
 DEMOS_AND_PLAYERS = [
@@ -17,9 +27,22 @@ DEMOS_AND_PLAYERS = [
 ]
 
 CSV_OUTPUT = "weapon_usage_per_player.csv"
+BOOTSTRAP_WORKERS = 1
+BACKEND = "pandas"
+UPDATE_PROFILES = True
+PREFETCH_DEPTH = 2  # demos read ahead of the one being parsed
+PREFETCH_BUDGET_BYTES = 2 * 1024 ** 3
+RUN_CHUNK_TICKS = 16384  # ticks parsed and run-encoded per call (each call re-reads the demo); None parses it in one call
 
 TRACKED_STEAMIDS = set([76561198262157518, 76561198155980865, 76561198962223770, 76561198816184658])
 
+# left out of the accuracy test: one grenade can hurt several players and knife/C4/Zeus "shots" are not aimed fire
+NON_GUN_WEAPONS = set([
+    'High Explosive Grenade', 'Flashbang', 'Smoke Grenade', 'Incendiary Grenade', 'Molotov', 'Decoy Grenade',
+    'knife', 'knife_t', 'Kukri Knife', 'C4 Explosive', 'Zeus x27', 'Unknown'
+])
+MIN_GUN_SHOTS = 50  # players with fewer gun shots over all demos are left out of the accuracy test
+
 def normalize_weapon_name(weapon_name):
     if pd.isna(weapon_name) or weapon_name == '':
         return 'Unknown'
@@ -129,21 +152,28 @@ def normalize_weapon_name(weapon_name):
 
 def main():
     all_player_weapon_data = []
+    profiles = ProfileStore() if UPDATE_PROFILES else None
+    
+    prefetcher = prefetch_demos([os.path.join(BASE_PATH, demo_file) for demo_file, _, _ in DEMOS_AND_PLAYERS], PREFETCH_DEPTH, PREFETCH_BUDGET_BYTES)
+    run_start = time.perf_counter()
     
     for demo_file, steamid, player_name in DEMOS_AND_PLAYERS:
-        demo_path = os.path.join(BASE_PATH, demo_file)
+        demo_path = find_demo(os.path.join(BASE_PATH, demo_file))
         
-        if not os.path.exists(demo_path):
+        if demo_path is None:
             print(f"Warning: {demo_file} not found, skipping...")
             continue
         
         print(f"\nProcessing {demo_file}...")
         
+        prefetcher.wait(demo_path)
+        print(f"  {prefetcher.report(demo_path)}")
+        
         try:
-            parser = DemoParser(demo_path)
+            parser = DemoParser(local_demo(demo_path))
             
-            tick_df = parser.parse_ticks(["active_weapon_name", "is_alive", "name"])
-            tick_df = pd.DataFrame(tick_df)
+            held_runs = load_runs(parser, ["active_weapon_name", "is_alive", "name"], ["is_alive", "active_weapon_name", "name"], RUN_CHUNK_TICKS)
+            print(f"  {runs_report(held_runs)}")
             
             print(f"  Parsing weapon fires and hits...")
             fires_df = pd.DataFrame(parser.parse_event("weapon_fire"))
@@ -161,58 +191,34 @@ def main():
                 sample_hurt_weapons = hurts_df['weapon'].unique()[:5]
                 print(f"  Sample player_hurt weapon names (normalized): {sample_hurt_weapons}")
             
-            all_steamids = tick_df['steamid'].unique()
+            all_steamids = held_runs['steamid'].unique()
             
             print(f"  Found {len(all_steamids)} unique players")
             tracked_in_demo = [sid for sid in all_steamids if sid in TRACKED_STEAMIDS]
             if tracked_in_demo:
                 print(f"  Tracked players in this demo: {tracked_in_demo}")
             
-            for current_steamid in all_steamids:
-                current_steamid_str = str(current_steamid)
-                player_df = tick_df[
-                    (tick_df['steamid'] == current_steamid) & 
-                    (tick_df['is_alive'] == True) &
-                    (tick_df['active_weapon_name'].notna())
-                ].copy()
-                
-                if len(player_df) == 0:
-                    continue
-                
-                player_actual_name = player_df['name'].iloc[0]
-                
-                player_fires = fires_df[fires_df['user_steamid'] == current_steamid_str].copy()
-                player_hits = hurts_df[hurts_df['attacker_steamid'] == current_steamid_str].copy()
+            usage = weapon_usage(held_runs, fires_df, hurts_df, backend=BACKEND)
+            
+            for current_steamid, weapon_data in usage.groupby('steamid', sort=False):
+                current_steamid = int(current_steamid)
+                player_actual_name = weapon_data['player_name'].iloc[0]
                 
                 if current_steamid in TRACKED_STEAMIDS:
+                    current_steamid_str = str(current_steamid)
+                    player_fires = fires_df[fires_df['user_steamid'] == current_steamid_str] if len(fires_df) > 0 else fires_df
+                    player_hits = hurts_df[hurts_df['attacker_steamid'] == current_steamid_str] if len(hurts_df) > 0 else hurts_df
                     print(f"    DEBUG: Player {player_actual_name} (ID: {current_steamid})")
                     print(f"           Total fires in events: {len(player_fires)}, Total hits: {len(player_hits)}")
                     if len(player_fires) > 0:
                         print(f"           Fire weapons: {player_fires['weapon'].unique()[:5]}")
                     if len(player_hits) > 0:
                         print(f"           Hit weapons: {player_hits['weapon'].unique()[:5]}")
-
-
-                
-                weapon_stats = {}
                 
-                for weapon in player_df['active_weapon_name'].unique():
-                    ticks_held = len(player_df[player_df['active_weapon_name'] == weapon])
-                    
-                    shots_fired = len(player_fires[player_fires['weapon'] == weapon])
-                    shots_hit = len(player_hits[player_hits['weapon'] == weapon])
-                    
-                    accuracy = (shots_hit / shots_fired * 100) if shots_fired > 0 else 0.0
-                    
-                    weapon_stats[weapon] = {
-                        'ticks_held': ticks_held,
-                        'shots_fired': shots_fired,
-                        'shots_hit': shots_hit,
-                        'accuracy_percentage': round(accuracy, 2)
-                    }
-                
-                weapon_data = pd.DataFrame.from_dict(weapon_stats, orient='index').reset_index()
-                weapon_data.columns = ['weapon', 'ticks_held', 'shots_fired', 'shots_hit', 'accuracy_percentage']
+                weapon_data = weapon_data[['weapon', 'ticks_held', 'shots_fired', 'shots_hit']].reset_index(drop=True)
+                weapon_data['accuracy_percentage'] = (
+                    weapon_data['shots_hit'] / weapon_data['shots_fired'].where(weapon_data['shots_fired'] > 0) * 100
+                ).fillna(0.0).round(2)
                 
                 weapon_data['steamid'] = current_steamid
                 weapon_data['player_name'] = player_actual_name
@@ -223,10 +229,22 @@ def main():
             
             print(f"  Processed {len(all_steamids)} players")
             
+            if profiles is not None:
+                counters = usage.groupby('steamid')[['shots_fired', 'shots_hit']].sum().to_dict(orient='index')
+                if profiles.record_demo(demo_file, "weapons", counters=counters):
+                    print(f"  Profiles: updated {len(counters)} players")
+                else:
+                    print(f"  Profiles: {demo_file} already recorded")
+            
         except Exception as e:
             print(f"  Error processing {demo_file}: {e}")
             continue
     
+    prefetcher.close()
+    if profiles is not None:
+        profiles.close()
+    print(f"\n{prefetcher.summary(time.perf_counter() - run_start)}")
+    
     if not all_player_weapon_data:
         print("\nNo weapon data collected!")
         return
@@ -265,6 +283,22 @@ def main():
     print(f"Total other players: {other_players}")
     print(f"Total rows: {len(output_df)}")
     
+    # one sample per player: gun hits over gun shots pooled across weapons and demos
+    gun_rows = output_df[~output_df['weapon'].isin(NON_GUN_WEAPONS)]
+    player_accuracy = gun_rows.groupby(['steamid', 'is_tracked'])[['total_shots_fired', 'total_shots_hit']].sum().reset_index()
+    player_accuracy = player_accuracy[player_accuracy['total_shots_fired'] >= MIN_GUN_SHOTS]
+    player_accuracy['gun_accuracy'] = player_accuracy['total_shots_hit'] / player_accuracy['total_shots_fired'] * 100
+    tracked_accuracy = player_accuracy.loc[player_accuracy['is_tracked'] == True, 'gun_accuracy']
+    other_accuracy = player_accuracy.loc[player_accuracy['is_tracked'] == False, 'gun_accuracy']
+    
+    print(f"\n{'='*80}")
+    print("SIGNIFICANCE (bootstrap CI, permutation test):")
+    print(f"{'='*80}")
+    print(f"Gun accuracy per player, {len(tracked_accuracy)} tracked vs {len(other_accuracy)} other players with {MIN_GUN_SHOTS}+ gun shots")
+    for statistic in ("mean", "median"):
+        result = compare_groups(tracked_accuracy, other_accuracy, statistic, workers=BOOTSTRAP_WORKERS)
+        print(format_comparison("Gun accuracy difference (tracked - other)", result, " pp"))
+    
     print(f"\n{'='*80}")
     print("Sample - Tracked Players Top Weapons:")
     print(f"{'='*80}\n")
@@ -0,0 +1,16 @@
+-- scatter.r's per-attacker summary, run over the cached kills tables
+SELECT
+    attacker_steamid,
+    any_value(attacker_name) AS attacker_name,
+    attacker_steamid IN (76561198262157518, 76561198155980865, 76561198962223770, 76561198816184658) AS is_cheater,
+    avg(headshot::INTEGER) AS avg_headshot_ratio,
+    count(*) AS kill_amnt,
+    sum(headshot::INTEGER) AS hs_amnt,
+    avg(thrusmoke::INTEGER) AS smoke_rat,
+    avg((penetrated > 0)::INTEGER) AS penetrated,
+    avg(noscope::INTEGER) AS ns
+FROM kills
+WHERE attacker_steamid IS NOT NULL
+GROUP BY attacker_steamid
+HAVING count(*) < 70
+ORDER BY is_cheater, kill_amnt DESC;
@@ -1,7 +1,15 @@
 import pandas as pd
 import os
+import sys
+import time
 from awpy import Demo
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from demolib.archives import find_demo, local_demo
+from demolib.bootstrap import compare_groups, format_comparison
+from demolib.prefetch import prefetch_demos
+from demolib.profiles import ProfileStore, steamid_key
+
 BASE_PATH = r"F:\steam\steamapps\common\Counter-Strike Global Offensive\game\csgo\replays"
 
 DEMOS_AND_PLAYERS = [
@@ -19,21 +27,32 @@ DEMOS_AND_PLAYERS = [
 CHEATER_STEAMIDS = {76561198262157518, 76561198155980865, 76561198962223770, 76561198816184658}
 
 CSV_OUTPUT = "kills_with_cheater_flag.csv"
+BOOTSTRAP_WORKERS = 1
+UPDATE_PROFILES = True
+PREFETCH_DEPTH = 2  # demos read ahead of the one being parsed
+PREFETCH_BUDGET_BYTES = 2 * 1024 ** 3
 
 def main():
     all_kills = []
+    profiles = ProfileStore() if UPDATE_PROFILES else None
+    
+    prefetcher = prefetch_demos([os.path.join(BASE_PATH, demo_file) for demo_file, _, _ in DEMOS_AND_PLAYERS], PREFETCH_DEPTH, PREFETCH_BUDGET_BYTES)
+    run_start = time.perf_counter()
     
     for demo_file, tracked_steamid, player_name in DEMOS_AND_PLAYERS:
-        demo_path = os.path.join(BASE_PATH, demo_file)
+        demo_path = find_demo(os.path.join(BASE_PATH, demo_file))
         
-        if not os.path.exists(demo_path):
+        if demo_path is None:
             print(f"Warning: {demo_file} not found, skipping...")
             continue
         
         print(f"\nProcessing {demo_file}...")
         
+        prefetcher.wait(demo_path)
+        print(f"  {prefetcher.report(demo_path)}")
+        
         try:
-            dem = Demo(demo_path)
+            dem = Demo(local_demo(demo_path))
             dem.parse()
             
             kills_df = dem.kills.to_pandas()
@@ -57,6 +76,18 @@ def main():
             
             all_kills.append(kills_subset)
             
+            if profiles is not None:
+                per_attacker = kills_subset.groupby('attacker_steamid').agg(
+                    kills=('headshot', 'size'),
+                    headshots=('headshot', 'sum'),
+                    thrusmoke_kills=('thrusmoke', 'sum')
+                )
+                counters = {steamid_key(sid): row for sid, row in per_attacker.to_dict(orient='index').items() if steamid_key(sid) is not None}
+                if profiles.record_demo(demo_file, "kills", counters=counters):
+                    print(f"  Profiles: updated {len(counters)} players")
+                else:
+                    print(f"  Profiles: {demo_file} already recorded")
+            
             cheater_kills = kills_subset['is_cheater'].sum()
             print(f"  Total kills: {len(kills_subset)}")
             print(f"  Cheater kills: {cheater_kills}")
@@ -66,6 +97,11 @@ def main():
             print(f"  Error processing {demo_file}: {e}")
             continue
     
+    prefetcher.close()
+    if profiles is not None:
+        profiles.close()
+    print(f"\n{prefetcher.summary(time.perf_counter() - run_start)}")
+    
     if not all_kills:
         print("\nNo kill data collected!")
         return
@@ -85,6 +121,15 @@ def main():
     print(f"\nKill statistics by cheater status:")
     print(combined_df.groupby('is_cheater')[['headshot', 'noscope', 'thrusmoke', 'penetrated']].mean().round(3))
     
+    cheater_headshots = combined_df.loc[combined_df['is_cheater'], 'headshot'].astype(float)
+    other_headshots = combined_df.loc[~combined_df['is_cheater'], 'headshot'].astype(float)
+    
+    print(f"\n{'='*80}")
+    print("SIGNIFICANCE (bootstrap CI, permutation test):")
+    print(f"{'='*80}")
+    result = compare_groups(cheater_headshots, other_headshots, "mean", workers=BOOTSTRAP_WORKERS)
+    print(format_comparison("Headshot ratio difference (cheater - other)", result))
+    
     print(f"\nSample data:")
     print(combined_df.head(20))
 
@@ -1,8 +1,17 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
+import time
 from demoparser2 import DemoParser
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from demolib.archives import find_demo, local_demo
+from demolib.frames import active_ticks as active_ticks_for, bin_time
+from demolib.rounds import RoundIndex
+from demolib.schema import load_ticks, memory_report
+from demolib.ticks import parse_ticks_strided
+
 DEMO_PATH = r"F:\steam\steamapps\common\Counter-Strike Global Offensive\game\csgo\replays\match730_003784108645122310500_1981615639_411.dem"
 CSV_OUTPUT = "fov_per_player_heatmap.csv"
 
@@ -22,8 +31,17 @@ NOISE_SENSITIVITY = 0.5
 FILL_MISSING_BINS = True
 MAX_ROUND_TIME = 120.0
 
+BACKEND = "pandas"
+
+STRIDE = 1  # keep every Nth tick; 1 = full 64 Hz resolution
+MIN_ROUND_TICKS = 10
+STRIDE_REPORT = False  # compare the heatmap at STRIDE_CANDIDATES against full resolution instead of saving it
+STRIDE_CANDIDATES = [2, 4, 8, 16, 32, 64]
+ERROR_BOUND = 0.05  # largest acceptable absolute error in any (player, time bin) cell
+STRIDE_REPORT_OUTPUT = "stride_report.csv"
+
 def normalize_angle_diff(angle1, angle2):
-    diff = angle2 - angle1
+    diff = float(angle2) - float(angle1)
     diff = (diff + 180) % 360 - 180
     return abs(diff)
 
@@ -40,44 +58,39 @@ def calculate_noise_factor(yaw_change, sensitivity):
     
     return noise_factor
 
-def main():
-    if not os.path.exists(DEMO_PATH):
-        print(f"Error: File {DEMO_PATH} not found.")
-        return
-
-    print(f"Parsing demo: {os.path.basename(DEMO_PATH)}...")
-    parser = DemoParser(DEMO_PATH)
+def count_enemies_in_fov(ticks, player_x, player_y, player_yaw, enemy_ticks, enemy_x, enemy_y):
+    # player rows are sorted by tick; each enemy row is matched to the player's row at the same tick
+    unique_ticks, first_row, row_tick = np.unique(ticks, return_index=True, return_inverse=True)
+    pos = np.searchsorted(unique_ticks, enemy_ticks)
+    pos = np.minimum(pos, len(unique_ticks) - 1)
+    matched = unique_ticks[pos] == enemy_ticks
+    pos = pos[matched]
+    rows = first_row[pos]
     
-    print("Parsing player positions...")
-    tick_df = parser.parse_ticks(["X", "Y", "yaw", "team_num", "name", "is_alive", "total_rounds_played"])
-    tick_df = pd.DataFrame(tick_df)
+    dx = enemy_x[matched].astype(np.float64) - player_x[rows].astype(np.float64)
+    dy = enemy_y[matched].astype(np.float64) - player_y[rows].astype(np.float64)
     
-    print("Parsing game state...")
-    game_state_df = parser.parse_ticks([
-        "is_warmup_period",
-        "is_terrorist_timeout",
-        "is_ct_timeout",
-        "is_technical_timeout",
-        "is_waiting_for_resume"
-    ])
-    game_state_df = pd.DataFrame(game_state_df)
+    angle_to_enemy = np.degrees(np.arctan2(dy, dx))
+    angle_diff = angle_to_enemy - player_yaw[rows].astype(np.float64)
+    angle_diff = (angle_diff + 180) % 360 - 180
+    
+    in_fov = np.abs(angle_diff) <= FOV_HALF_ANGLE
+    per_tick = np.bincount(pos[in_fov], minlength=len(unique_ticks))
+    return per_tick[row_tick.ravel()]
+
+def compute_heatmap(parser, active_ticks, stride=1, verbose=True):
+    log = print if verbose else (lambda *args, **kwargs: None)
+    
+    log("Parsing player positions...")
+    tick_df = parse_ticks_strided(parser, ["X", "Y", "yaw", "team_num", "name", "is_alive", "total_rounds_played"], active_ticks, stride)
+    log(memory_report(tick_df))
     
-    print("Filtering active gameplay...")
-    active_ticks = game_state_df[
-        (game_state_df['is_warmup_period'] == False) &
-        (game_state_df['is_terrorist_timeout'] == False) &
-        (game_state_df['is_ct_timeout'] == False) &
-        (game_state_df['is_technical_timeout'] == False) &
-        (game_state_df['is_waiting_for_resume'] == False)
-    ]['tick'].unique()
-    
-    tick_df = tick_df[tick_df['tick'].isin(active_ticks)].copy()
     tick_df = tick_df[tick_df['is_alive'] == True].copy()
     tick_df['steamid_str'] = tick_df['steamid'].astype(str)
     
-    print(f"Active gameplay rows: {len(tick_df)}")
+    log(f"Active gameplay rows: {len(tick_df)}" + (f" (stride {stride})" if stride > 1 else ""))
     
-    print("\nCalculating yaw changes and noise factors...")
+    log("\nCalculating yaw changes and noise factors...")
     tick_df = tick_df.sort_values(['steamid', 'total_rounds_played', 'tick'])
     tick_df['yaw_prev'] = tick_df.groupby(['steamid', 'total_rounds_played'])['yaw'].shift(1)
     tick_df['yaw_change'] = tick_df.apply(
@@ -93,82 +106,64 @@ def main():
     avg_noise = tick_df['noise_factor'].mean()
     low_quality_pct = (tick_df['noise_factor'] < 0.5).sum() / len(tick_df) * 100
     
-    print(f"Noise analysis:")
-    print(f"  Average noise factor: {avg_noise:.3f}")
-    print(f"  Low quality data (<0.5 noise factor): {low_quality_pct:.2f}%")
+    log(f"Noise analysis:")
+    log(f"  Average noise factor: {avg_noise:.3f}")
+    log(f"  Low quality data (<0.5 noise factor): {low_quality_pct:.2f}%")
     
-    print("\nProcessing each player (OPTIMIZED)...")
+    log("\nProcessing each player (OPTIMIZED)...")
     
     all_results = []
+    min_round_rows = -(-MIN_ROUND_TICKS // stride)
     
     unique_players = tick_df[['steamid', 'name']].drop_duplicates()
+    round_index = RoundIndex(tick_df)
     
     for idx, (steamid, player_name) in enumerate(unique_players.values):
-        print(f"  [{idx+1}/{len(unique_players)}] Processing {player_name}...", end=' ')
+        log(f"  [{idx+1}/{len(unique_players)}] Processing {player_name}...", end=' ')
         
-        player_data = tick_df[tick_df['steamid'] == steamid].copy()
-        player_team = player_data['team_num'].iloc[0]
+        player_rounds_played = round_index.player_rounds(steamid)
+        first_start, _ = round_index.bounds(player_rounds_played[0], steamid)
+        player_team = round_index.column('team_num', first_start, first_start + 1)[0]
         is_tracked = steamid in TRACKED_STEAMIDS
         
         player_rounds = []
         
-        for round_num in player_data['total_rounds_played'].unique():
-            round_data = player_data[player_data['total_rounds_played'] == round_num].copy()
+        for round_num in player_rounds_played:
+            start, end = round_index.bounds(round_num, steamid)
             
-            if len(round_data) < 10:
+            if end - start < min_round_rows:
                 continue
             
-            round_data = round_data.sort_values('tick')
+            round_data = round_index.frame.iloc[start:end].copy()
             
             round_start_tick = round_data['tick'].min()
             round_data['time_in_round'] = (round_data['tick'] - round_start_tick) / TICK_RATE
             
-            enemies_at_round = tick_df[
-                (tick_df['total_rounds_played'] == round_num) &
-                (tick_df['team_num'] != player_team) &
-                (tick_df['steamid'] != steamid)
-            ]
+            round_start, round_end = round_index.round_bounds(round_num)
+            is_enemy = (
+                (round_index.column('team_num', round_start, round_end) != player_team) &
+                (round_index.column('steamid', round_start, round_end) != steamid)
+            )
             
-            enemies_in_fov_per_tick = []
-            
-            for tick in round_data['tick'].values:
-                player_tick = round_data[round_data['tick'] == tick]
-                enemies_tick = enemies_at_round[enemies_at_round['tick'] == tick]
-                
-                if len(enemies_tick) == 0:
-                    enemies_in_fov_per_tick.append(0)
-                    continue
-                
-                player_x = player_tick['X'].values[0]
-                player_y = player_tick['Y'].values[0]
-                player_yaw = player_tick['yaw'].values[0]
-                
-                dx = enemies_tick['X'].values - player_x
-                dy = enemies_tick['Y'].values - player_y
-                
-                angle_to_enemy = np.degrees(np.arctan2(dy, dx))
-                angle_diff = angle_to_enemy - player_yaw
-                angle_diff = (angle_diff + 180) % 360 - 180
-                
-                in_fov = np.abs(angle_diff) <= FOV_HALF_ANGLE
-                enemies_in_fov_per_tick.append(in_fov.sum())
-            
-            round_data['enemies_in_fov'] = enemies_in_fov_per_tick
+            round_data['enemies_in_fov'] = count_enemies_in_fov(
+                round_index.column('tick', start, end),
+                round_index.column('X', start, end),
+                round_index.column('Y', start, end),
+                round_index.column('yaw', start, end),
+                round_index.column('tick', round_start, round_end)[is_enemy],
+                round_index.column('X', round_start, round_end)[is_enemy],
+                round_index.column('Y', round_start, round_end)[is_enemy]
+            )
             
             player_rounds.append(round_data)
         
         if len(player_rounds) == 0:
-            print("No data")
+            log("No data")
             continue
         
         all_player_data = pd.concat(player_rounds, ignore_index=True)
         
-        all_player_data['time_bin'] = (all_player_data['time_in_round'] // TIME_BIN_SIZE) * TIME_BIN_SIZE
-        
-        binned = all_player_data.groupby('time_bin').agg({
-            'enemies_in_fov': 'mean',
-            'noise_factor': 'mean'
-        }).reset_index()
+        binned = bin_time(all_player_data, TIME_BIN_SIZE, ['enemies_in_fov', 'noise_factor'], backend=BACKEND)
         
         binned.columns = ['time_bin', 'avg_enemies_in_fov', 'avg_noise_factor']
         
@@ -186,14 +181,96 @@ def main():
         
         all_results.append(binned)
         
-        print(f"✓ {len(binned)} time bins")
+        log(f"✓ {len(binned)} time bins")
     
     if len(all_results) == 0:
-        print("\nNo data collected!")
-        return
+        return None
     
     final_df = pd.concat(all_results, ignore_index=True)
-    final_df = final_df.sort_values(['is_tracked', 'player_name', 'time_bin'])
+    return final_df.sort_values(['is_tracked', 'player_name', 'time_bin']).reset_index(drop=True)
+
+def heatmap_error(full_df, strided_df):
+    merged = full_df.merge(strided_df, on=['steamid', 'time_bin'], how='outer', suffixes=('_full', '_strided'))
+    errors = {}
+    for col, missing in (('avg_enemies_in_fov', 0.0), ('avg_noise_factor', 1.0)):
+        diff = (merged[f'{col}_full'].fillna(missing) - merged[f'{col}_strided'].fillna(missing)).abs()
+        errors[f'max_err_{col}'] = diff.max()
+        errors[f'mean_err_{col}'] = diff.mean()
+    return errors
+
+def stride_report(parser, active_ticks):
+    rows = []
+    full_df = None
+    for stride in [1] + [s for s in STRIDE_CANDIDATES if s > 1]:
+        print(f"  Stride {stride}...", end=' ')
+        start = time.perf_counter()
+        heatmap_df = compute_heatmap(parser, active_ticks, stride, verbose=False)
+        seconds = time.perf_counter() - start
+        if heatmap_df is None:
+            print("No data")
+            return None
+        if full_df is None:
+            full_df = heatmap_df
+        row = {'stride': stride, 'seconds': seconds, **heatmap_error(full_df, heatmap_df)}
+        row['within_bound'] = max(row['max_err_avg_enemies_in_fov'], row['max_err_avg_noise_factor']) <= ERROR_BOUND
+        rows.append(row)
+        print(f"{seconds:.1f}s")
+    
+    report_df = pd.DataFrame(rows)
+    report_df['speedup'] = report_df['seconds'].iloc[0] / report_df['seconds']
+    return report_df
+
+def main():
+    demo_path = find_demo(DEMO_PATH)
+    if demo_path is None:
+        print(f"Error: File {DEMO_PATH} not found.")
+        return
+
+    print(f"Parsing demo: {os.path.basename(demo_path)}...")
+    parser = DemoParser(local_demo(demo_path))
+    
+    print("Parsing game state...")
+    game_state_df = load_ticks(parser, [
+        "is_warmup_period",
+        "is_terrorist_timeout",
+        "is_ct_timeout",
+        "is_technical_timeout",
+        "is_waiting_for_resume"
+    ])
+    
+    print("Filtering active gameplay...")
+    active_ticks = active_ticks_for(game_state_df, [
+        "is_warmup_period",
+        "is_terrorist_timeout",
+        "is_ct_timeout",
+        "is_technical_timeout",
+        "is_waiting_for_resume"
+    ], backend=BACKEND)
+    
+    if STRIDE_REPORT:
+        print(f"\nComparing strides {STRIDE_CANDIDATES} against full resolution...")
+        report_df = stride_report(parser, active_ticks)
+        if report_df is None:
+            print("\nNo data collected!")
+            return
+        report_df = report_df.round(4)
+        report_df.to_csv(STRIDE_REPORT_OUTPUT, index=False)
+        
+        print(f"\n{'='*80}")
+        print(f"STRIDE ACCURACY REPORT (error bound {ERROR_BOUND})")
+        print(f"{'='*80}")
+        print(report_df.to_string(index=False))
+        
+        best = report_df[report_df['within_bound']].sort_values('seconds').iloc[0]
+        print(f"\nFastest stride within bound: {int(best['stride'])} ({best['speedup']:.1f}x faster than full resolution)")
+        print(f"Report saved to {STRIDE_REPORT_OUTPUT}")
+        return
+    
+    final_df = compute_heatmap(parser, active_ticks, STRIDE)
+    
+    if final_df is None:
+        print("\nNo data collected!")
+        return
     
     final_df.to_csv(CSV_OUTPUT, index=False)
     
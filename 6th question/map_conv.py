@@ -1,67 +1,51 @@
 import pandas as pd
 import os
+import sys
 from demoparser2 import DemoParser
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from demolib.archives import find_demo, local_demo
+from demolib.frames import active_ticks as active_ticks_for, attach_firing
+from demolib.schema import load_ticks, memory_report, widen_floats
+from demolib.ticks import parse_ticks_strided
+
 DEMO_PATH = r"F:\steam\steamapps\common\Counter-Strike Global Offensive\game\csgo\replays\match730_003784108645122310500_1981615639_411.dem"
 CSV_OUTPUT = "player_positions.csv"
 TICK_RATE = 64
+BACKEND = "pandas"
+STRIDE = 1  # e.g. 32 to export only the ticks map_anim.r keeps (every 32nd plus firing ticks)
 
 def main():
-    if not os.path.exists(DEMO_PATH):
+    demo_path = find_demo(DEMO_PATH)
+    if demo_path is None:
         print(f"Error: File {DEMO_PATH} not found.")
         return
 
-    print(f"Parsing demo: {os.path.basename(DEMO_PATH)}...")
-    parser = DemoParser(DEMO_PATH)
-    
-    print("Parsing player positions and view angles...")
-    tick_df = parser.parse_ticks(["X", "Y", "Z", "pitch", "yaw", "team_num", "name", "is_alive"])
-    tick_df = pd.DataFrame(tick_df)
+    print(f"Parsing demo: {os.path.basename(demo_path)}...")
+    parser = DemoParser(local_demo(demo_path))
     
     print("Parsing game state...")
-    game_state_df = parser.parse_ticks(["is_freeze_period", "is_warmup_period", "is_terrorist_timeout", "is_ct_timeout", "is_technical_timeout", "is_waiting_for_resume"])
-    game_state_df = pd.DataFrame(game_state_df)
+    game_state_df = load_ticks(parser, ["is_freeze_period", "is_warmup_period", "is_terrorist_timeout", "is_ct_timeout", "is_technical_timeout", "is_waiting_for_resume"])
     
     print("Filtering out non-active gameplay (warmup, freeze, timeouts)...")
-    active_ticks = game_state_df[
-        (game_state_df['is_freeze_period'] == False) &
-        (game_state_df['is_warmup_period'] == False) &
-        (game_state_df['is_terrorist_timeout'] == False) &
-        (game_state_df['is_ct_timeout'] == False) &
-        (game_state_df['is_technical_timeout'] == False) &
-        (game_state_df['is_waiting_for_resume'] == False)
-    ]['tick'].unique()
+    active_ticks = active_ticks_for(game_state_df, ["is_freeze_period", "is_warmup_period", "is_terrorist_timeout", "is_ct_timeout", "is_technical_timeout", "is_waiting_for_resume"], backend=BACKEND)
     
     print(f"Active ticks: {len(active_ticks)} out of {len(game_state_df['tick'].unique())}")
     
-    tick_df = tick_df[tick_df['tick'].isin(active_ticks)].copy()
-    
     print("Parsing weapon fire events...")
     fires_df = pd.DataFrame(parser.parse_event("weapon_fire"))
     
-    if len(fires_df) > 0:
-        fires_df['user_steamid'] = fires_df['user_steamid'].astype(str)
-        fires_df['is_gun_fire'] = ~fires_df['weapon'].str.contains('knife', case=False, na=False)
-        gun_fires = fires_df[fires_df['is_gun_fire'] == True][['tick', 'user_steamid']].copy()
-        gun_fires['is_firing'] = True
-    else:
-        gun_fires = pd.DataFrame(columns=['tick', 'user_steamid', 'is_firing'])
-    
-    tick_df['steamid_str'] = tick_df['steamid'].astype(str)
-    
-    tick_df = tick_df.merge(
-        gun_fires,
-        left_on=['tick', 'steamid_str'],
-        right_on=['tick', 'user_steamid'],
-        how='left'
-    )
+    print("Parsing player positions and view angles...")
+    tick_df = parse_ticks_strided(parser, ["X", "Y", "Z", "pitch", "yaw", "team_num", "name", "is_alive"], active_ticks, STRIDE, keep_ticks=fires_df.get('tick', []))
+    print(memory_report(tick_df))
     
-    tick_df['is_firing'] = tick_df['is_firing'].fillna(False)
+    tick_df = attach_firing(tick_df, fires_df, backend=BACKEND)
     
     tick_df['time_seconds'] = (tick_df['tick'] / TICK_RATE).round(2)
     
     output_df = tick_df[['tick', 'time_seconds', 'steamid', 'name', 'team_num', 'X', 'Y', 'Z', 'pitch', 'yaw', 'is_alive', 'is_firing']].copy()
     output_df = output_df.sort_values(['tick', 'steamid']).reset_index(drop=True)
+    output_df = widen_floats(output_df)
     
     output_df.to_csv(CSV_OUTPUT, index=False)
     
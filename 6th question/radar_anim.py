@@ -0,0 +1,172 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import time
+from multiprocessing import Pool
+from PIL import GifImagePlugin, Image, ImageDraw
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from demolib.radar import view_line_ends, world_to_radar
+
+CSV_INPUT = "player_positions.csv"
+MAP_NAME = "de_mirage"
+RADAR_IMAGE = os.path.join("maps", MAP_NAME, "radar.png")
+OUTPUT = "radar.gif"  # ".gif" or ".mp4" (mp4 needs PyAV)
+
+FRAME_SIZE = 1024
+FRAME_STRIDE = 32
+FPS = 20
+WORKERS = os.cpu_count() or 1
+BATCH_FRAMES = 64
+
+CHEATER_NAMES = {"KasaK"}
+
+# sizes are in map_anim.r's 2048px canvas and get scaled to FRAME_SIZE
+CANVAS_SIZE = 2048
+VIEW_LINE_LENGTH = 40
+FIRING_LINE_LENGTH = 100
+MARKER_RADIUS = 10
+LINE_WIDTH = 3
+
+SIDE_COLORS = [
+    (255, 165, 0),   # T
+    (0, 0, 255),     # CT
+    (245, 90, 66),   # Cheater T side
+    (164, 66, 245),  # Cheater CT side
+]
+
+_background = None
+_encode_gif = False
+
+
+def load_frames():
+    df = pd.read_csv(CSV_INPUT, usecols=['tick', 'steamid', 'name', 'team_num', 'X', 'Y', 'yaw', 'is_alive', 'is_firing'])
+    df = df.sort_values(['tick', 'steamid']).reset_index(drop=True)
+
+    firing_rows = df[df['is_firing'] == True]
+    firing_frame_tick = ((firing_rows['tick'] + FRAME_STRIDE - 1) // FRAME_STRIDE) * FRAME_STRIDE
+    firing_keys = pd.MultiIndex.from_arrays([firing_frame_tick, firing_rows['steamid']])
+
+    sampled = df[df['tick'] % FRAME_STRIDE == 0]
+    sampled_keys = pd.MultiIndex.from_arrays([sampled['tick'], sampled['steamid']])
+    is_firing = sampled_keys.isin(firing_keys)
+
+    side = (sampled['team_num'] == 3).to_numpy(np.int8) + 2 * sampled['name'].isin(CHEATER_NAMES).to_numpy(np.int8)
+
+    px, py = world_to_radar(sampled['X'], sampled['Y'], MAP_NAME, FRAME_SIZE)
+    length = np.where(is_firing, FIRING_LINE_LENGTH, VIEW_LINE_LENGTH) * FRAME_SIZE / CANVAS_SIZE
+    ex, ey = view_line_ends(px, py, sampled['yaw'], length)
+
+    ticks = sampled['tick'].to_numpy()
+    alive = sampled['is_alive'].to_numpy(bool)
+    bounds = np.concatenate([[0], np.flatnonzero(np.diff(ticks)) + 1, [len(ticks)]])
+
+    columns = [a.astype(np.float32) for a in (px, py, ex, ey)]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        yield tuple(c[start:end] for c in columns) + (side[start:end], alive[start:end])
+
+
+def init_worker(radar_image, size, encode_gif):
+    global _background, _encode_gif
+    _background = Image.open(radar_image).convert("RGBA").resize((size, size))
+    _encode_gif = encode_gif
+
+
+def render_frame(task):
+    px, py, ex, ey, side, alive = task
+    k = FRAME_SIZE / CANVAS_SIZE
+    radius = MARKER_RADIUS * k
+    width = max(1, round(LINE_WIDTH * k))
+
+    overlay = Image.new("RGBA", _background.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    for i in np.flatnonzero(alive):
+        draw.line([(px[i], py[i]), (ex[i], ey[i])], fill=SIDE_COLORS[side[i]] + (128,), width=width)
+
+    frame = Image.alpha_composite(_background, overlay)
+    draw = ImageDraw.Draw(frame)
+    for i in range(len(px)):
+        color = SIDE_COLORS[side[i]]
+        if alive[i]:
+            draw.ellipse([px[i] - radius, py[i] - radius, px[i] + radius, py[i] + radius], fill=color)
+        else:
+            draw.line([(px[i] - radius, py[i] - radius), (px[i] + radius, py[i] + radius)], fill=color, width=width)
+            draw.line([(px[i] - radius, py[i] + radius), (px[i] + radius, py[i] - radius)], fill=color, width=width)
+
+    frame = frame.convert("RGB")
+    if _encode_gif:
+        paletted = frame.quantize(colors=256)
+        return b"".join(GifImagePlugin.getdata(paletted, duration=1000 / FPS, include_color_table=True))
+    return np.asarray(frame)
+
+
+def rendered_frames(pool, tasks):
+    batch = []
+    for task in tasks:
+        batch.append(task)
+        if len(batch) == BATCH_FRAMES:
+            yield from pool.imap(render_frame, batch)
+            batch = []
+    if batch:
+        yield from pool.imap(render_frame, batch)
+
+
+def write_gif(frames, path):
+    header, _ = GifImagePlugin.getheader(Image.new("P", (FRAME_SIZE, FRAME_SIZE)), info={"loop": 0, "duration": 1000 / FPS})
+    count = 0
+    with open(path, "wb") as f:
+        f.write(b"".join(header))
+        for frame_data in frames:
+            f.write(frame_data)
+            count += 1
+        f.write(b";")
+    return count
+
+
+def write_video(frames, path):
+    import av
+
+    count = 0
+    container = av.open(path, mode="w")
+    stream = container.add_stream("libx264", rate=FPS)
+    stream.width = FRAME_SIZE
+    stream.height = FRAME_SIZE
+    stream.pix_fmt = "yuv420p"
+    for frame in frames:
+        for packet in stream.encode(av.VideoFrame.from_ndarray(frame, format="rgb24")):
+            container.mux(packet)
+        count += 1
+    for packet in stream.encode():
+        container.mux(packet)
+    container.close()
+    return count
+
+
+def main():
+    if not os.path.exists(CSV_INPUT):
+        print(f"Error: File {CSV_INPUT} not found. Run map_conv.py first.")
+        return
+
+    if not os.path.exists(RADAR_IMAGE):
+        print(f"Error: Radar image {RADAR_IMAGE} not found.")
+        return
+
+    encode_gif = OUTPUT.lower().endswith(".gif")
+
+    print(f"Rendering {CSV_INPUT} onto {MAP_NAME} radar with {WORKERS} workers...")
+    start = time.perf_counter()
+
+    with Pool(WORKERS, initializer=init_worker, initargs=(RADAR_IMAGE, FRAME_SIZE, encode_gif)) as pool:
+        frames = rendered_frames(pool, load_frames())
+        if encode_gif:
+            count = write_gif(frames, OUTPUT)
+        else:
+            count = write_video(frames, OUTPUT)
+
+    elapsed = time.perf_counter() - start
+    print(f"\nSaved {count} frames to {OUTPUT} in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.1f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+from demolib.worker import WORKER_HOST, WORKER_PORT, serve
+
+PRELOAD_MAPS = ["de_mirage"]
+
+def main():
+    serve(WORKER_HOST, WORKER_PORT, preload_maps=PRELOAD_MAPS)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from demolib.frames import BACKENDS, active_ticks, attach_firing, bin_time, weapon_usage
+from demolib.schema import compact_ticks
+
+N_TICKS = 150_000
+N_PLAYERS = 10
+N_FIRES = 40_000
+REPEATS = 3
+SEED = 0
+FLOAT_RTOL = 1e-9  # polars and pandas sum floats in a different order, so means can differ in the last digits
+
+WEAPONS = ["ak47", "m4a1", "awp", "deagle", "glock", "usp_silencer", "knife", "hegrenade"]
+GAME_STATE_FLAGS = ["is_freeze_period", "is_warmup_period", "is_terrorist_timeout", "is_ct_timeout", "is_technical_timeout", "is_waiting_for_resume"]
+
+def synthetic_demo(rng):
+    steamids = 76561198000000000 + np.arange(N_PLAYERS) * 1_000_003
+    ticks = np.repeat(np.arange(N_TICKS), N_PLAYERS)
+    players = np.tile(np.arange(N_PLAYERS), N_TICKS)
+    n = len(ticks)
+
+    tick_df = pd.DataFrame({
+        'tick': ticks,
+        'steamid': steamids[players],
+        'name': np.array([f"player{i}" for i in range(N_PLAYERS)])[players],
+        'X': rng.normal(0, 1000, n),
+        'Y': rng.normal(0, 1000, n),
+        'Z': rng.normal(0, 100, n),
+        'pitch': rng.uniform(-90, 90, n),
+        'yaw': rng.uniform(-180, 180, n),
+        'team_num': np.where(players < N_PLAYERS // 2, 2, 3),
+        'is_alive': rng.random(n) > 0.3,
+        'active_weapon_name': np.where(rng.random(n) > 0.02, np.array(WEAPONS)[rng.integers(0, len(WEAPONS), n)], None),
+    })
+    tick_df = compact_ticks(tick_df)
+
+    game_state_df = pd.DataFrame({'tick': ticks})
+    for flag in GAME_STATE_FLAGS:
+        game_state_df[flag] = np.repeat(rng.random(N_TICKS) < 0.05, N_PLAYERS)
+    game_state_df = game_state_df.astype({flag: "boolean" for flag in GAME_STATE_FLAGS})
+    game_state_df.loc[rng.random(n) < 0.001, 'is_warmup_period'] = pd.NA
+
+    fire_players = rng.integers(0, N_PLAYERS, N_FIRES)
+    fires_df = pd.DataFrame({
+        'tick': np.sort(rng.integers(0, N_TICKS, N_FIRES)),
+        'user_steamid': steamids[fire_players].astype(str),
+        'weapon': np.array(WEAPONS)[rng.integers(0, len(WEAPONS), N_FIRES)],
+    })
+    hurts_df = fires_df.sample(frac=0.3, random_state=SEED).rename(columns={'user_steamid': 'attacker_steamid'})
+
+    player_data = pd.DataFrame({
+        'time_in_round': rng.uniform(0, 120, n // N_PLAYERS),
+        'enemies_in_fov': rng.integers(0, 5, n // N_PLAYERS),
+        'noise_factor': rng.random(n // N_PLAYERS),
+    })
+
+    return tick_df, game_state_df, fires_df, hurts_df, player_data
+
+def stages(tick_df, game_state_df, fires_df, hurts_df, player_data):
+    return {
+        "game-state filter": lambda backend: pd.DataFrame({'tick': active_ticks(game_state_df, GAME_STATE_FLAGS, backend=backend)}),
+        "fire join": lambda backend: attach_firing(tick_df, fires_df, backend=backend),
+        "weapon group-by": lambda backend: weapon_usage(tick_df, fires_df, hurts_df, backend=backend),
+        "time binning": lambda backend: bin_time(player_data, 5.0, ['enemies_in_fov', 'noise_factor'], backend=backend),
+    }
+
+def same_output(expected, actual):
+    # same columns, rows and values; floats within FLOAT_RTOL, dtypes free to differ
+    # (polars hands back object strings and its own nullable types)
+    if list(expected.columns) != list(actual.columns) or len(expected) != len(actual):
+        return False
+    for col in expected.columns:
+        left = expected[col].astype(object) if isinstance(expected[col].dtype, pd.CategoricalDtype) else expected[col]
+        right = actual[col].astype(object) if isinstance(actual[col].dtype, pd.CategoricalDtype) else actual[col]
+        if pd.api.types.is_float_dtype(left.dtype):
+            if not np.allclose(left.to_numpy(np.float64), right.to_numpy(np.float64), rtol=FLOAT_RTOL, atol=0, equal_nan=True):
+                return False
+        elif not (left.astype(object).where(left.notna(), None).tolist() == right.astype(object).where(right.notna(), None).tolist()):
+            return False
+    return True
+
+def main():
+    try:
+        import polars
+    except ImportError:
+        print("polars is not installed, only the pandas backend can run")
+        return
+
+    rng = np.random.default_rng(SEED)
+    data = synthetic_demo(rng)
+    print(f"Synthetic demo: {N_TICKS} ticks x {N_PLAYERS} players, {N_FIRES} fires (polars {polars.__version__})")
+
+    print(f"\n{'='*80}")
+    print(f"{'Stage':<20} {'pandas (s)':>12} {'polars (s)':>12} {'speedup':>9}  matches (rtol {FLOAT_RTOL:g})")
+    print(f"{'='*80}")
+
+    for stage, run in stages(*data).items():
+        timings = {}
+        outputs = {}
+        for backend in BACKENDS:
+            best = float("inf")
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                outputs[backend] = run(backend)
+                best = min(best, time.perf_counter() - start)
+            timings[backend] = best
+
+        matches = same_output(outputs["pandas"], outputs["polars"])
+        speedup = timings["pandas"] / timings["polars"]
+        print(f"{stage:<20} {timings['pandas']:>12.4f} {timings['polars']:>12.4f} {speedup:>8.2f}x  {matches}")
+
+if __name__ == "__main__":
+    main()
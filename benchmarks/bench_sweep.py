@@ -0,0 +1,210 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from demolib.engagements import worker_pool
+from demolib.schema import compact_ticks
+from demolib.spotting import EYE_HEIGHT
+from demolib.sweep import FOV_HALF_ANGLE, PLAYING_TEAMS, sweep_match
+
+TICK_RATE = 64
+N_PLAYERS = 10
+N_ROUNDS = 24
+ROUND_SECONDS = 90
+CHECK_ROUNDS = 2  # brute-force check runs on a short match, every enemy pair raycast on every tick
+CHECK_ROUND_SECONDS = 15
+N_BOXES = 60
+MAP_SIZE = 4096.0
+RUN_SPEED = 250.0 / TICK_RATE
+STILL_SHARE = 0.5  # share of a round a player spends holding a spot
+SWEEP_WORKERS = 1
+TRI_PATH = None  # a map's .tri file to time awpy's VisibilityChecker instead of the box checker
+SEED = 0
+
+
+class BoxChecker:
+    # line of sight blocked by axis-aligned boxes, a stand-in for awpy's VisibilityChecker
+    def __init__(self, boxes):
+        self.low = boxes[:, :3]
+        self.high = boxes[:, 3:]
+
+    def is_visible(self, start, end):
+        start = np.asarray(start, dtype=np.float64)
+        direction = np.asarray(end, dtype=np.float64) - start
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t1 = (self.low - start) / direction
+            t2 = (self.high - start) / direction
+        # an axis the segment does not move along: inside the slab everywhere or nowhere
+        flat = direction == 0
+        inside = (start >= self.low) & (start <= self.high)
+        t_low = np.where(flat, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+        t_high = np.where(flat, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2))
+        enter = np.maximum(t_low.max(axis=1), 0.0)
+        leave = np.minimum(t_high.min(axis=1), 1.0)
+        return not bool((enter <= leave).any())
+
+
+def synthetic_boxes(rng):
+    corner = rng.uniform(0, MAP_SIZE, (N_BOXES, 2))
+    size = rng.uniform(64, 512, (N_BOXES, 2))
+    height = rng.uniform(48, 256, N_BOXES)
+    return np.column_stack([corner, np.zeros(N_BOXES), corner + size, height])
+
+
+def synthetic_match(rng, n_rounds, round_seconds):
+    # players alternate between running in a straight line and holding still, and
+    # die at a random point in the round; one row per player per live tick
+    steamids = 76561198000000000 + np.arange(N_PLAYERS, dtype=np.uint64) * 1_000_003
+    teams = np.where(np.arange(N_PLAYERS) < N_PLAYERS // 2, 2, 3)
+    round_ticks = round_seconds * TICK_RATE
+    frames = []
+    tick0 = 0
+
+    for round_num in range(n_rounds):
+        pos = rng.uniform(0, MAP_SIZE, (N_PLAYERS, 2))
+        heading = rng.uniform(-np.pi, np.pi, N_PLAYERS)
+        death = rng.integers(round_ticks // 4, round_ticks + 1, N_PLAYERS)
+        xy = np.empty((round_ticks, N_PLAYERS, 2))
+        yaw = np.empty((round_ticks, N_PLAYERS))
+        for t in range(round_ticks):
+            turning = rng.random(N_PLAYERS) < 0.02
+            heading = np.where(turning, rng.uniform(-np.pi, np.pi, N_PLAYERS), heading)
+            moving = (t // TICK_RATE + np.arange(N_PLAYERS)) % 10 >= STILL_SHARE * 10
+            step = np.column_stack([np.cos(heading), np.sin(heading)]) * RUN_SPEED * moving[:, None]
+            pos = np.clip(pos + step, 0, MAP_SIZE)
+            xy[t] = pos
+            yaw[t] = np.degrees(heading) + rng.normal(0, 20, N_PLAYERS)
+
+        ticks = np.arange(round_ticks)
+        alive = ticks[:, None] < death[None, :]
+        t_idx, p_idx = np.nonzero(alive)
+        frames.append(pd.DataFrame({
+            'tick': tick0 + t_idx,
+            'steamid': steamids[p_idx],
+            'X': xy[t_idx, p_idx, 0],
+            'Y': xy[t_idx, p_idx, 1],
+            'Z': np.zeros(len(t_idx)),
+            'yaw': (yaw[t_idx, p_idx] + 180) % 360 - 180,
+            'is_alive': True,
+            'team_num': teams[p_idx],
+            'total_rounds_played': round_num,
+        }))
+        # freeze time between rounds leaves a gap in the ticks
+        tick0 += round_ticks + 15 * TICK_RATE
+
+    return compact_ticks(pd.concat(frames, ignore_index=True))
+
+
+def brute_force_onsets(tick_df, vc, fov_half_angle=FOV_HALF_ANGLE):
+    # every enemy pair raycast on every tick, one directed pair at a time
+    rows = []
+    for round_num, round_df in tick_df.groupby('total_rounds_played', sort=True):
+        players = np.unique(round_df['steamid'].to_numpy(np.uint64))
+        by_tick = {tick: df.set_index('steamid') for tick, df in round_df.groupby('tick', sort=True)}
+        open_runs = {}
+        prev_tick = None
+
+        for tick, df in by_tick.items():
+            seen = {}
+            for i, a in enumerate(players):
+                for b in players[i + 1:]:
+                    if a not in df.index or b not in df.index:
+                        continue
+                    ra, rb = df.loc[a], df.loc[b]
+                    team_a, team_b = int(ra['team_num']), int(rb['team_num'])
+                    if not (ra['is_alive'] and rb['is_alive']) or team_a not in PLAYING_TEAMS or team_b not in PLAYING_TEAMS or team_a == team_b:
+                        continue
+                    pa = np.array([ra['X'], ra['Y'], ra['Z']], dtype=np.float64)
+                    pb = np.array([rb['X'], rb['Y'], rb['Z']], dtype=np.float64)
+                    if not vc.is_visible(tuple(pa + [0, 0, EYE_HEIGHT]), tuple(pb + [0, 0, EYE_HEIGHT])):
+                        continue
+                    for observer, target, po, pt, row in ((a, b, pa, pb, ra), (b, a, pb, pa, rb)):
+                        angle = np.degrees(np.arctan2(pt[1] - po[1], pt[0] - po[0])) - np.float64(row['yaw'])
+                        angle = abs((angle + 180) % 360 - 180)
+                        if angle <= fov_half_angle:
+                            seen[(observer, target)] = (angle, np.sqrt(((pt - po) ** 2).sum()))
+
+            contiguous = prev_tick is not None and tick == prev_tick + 1
+            for key in list(open_runs):
+                if key not in seen or not contiguous:
+                    rows.append(open_runs.pop(key))
+            for key, (angle, distance) in seen.items():
+                if key in open_runs:
+                    open_runs[key]['end_tick'] = tick
+                else:
+                    open_runs[key] = {
+                        'round': round_num, 'tick': tick, 'end_tick': tick,
+                        'observer_steamid': key[0], 'target_steamid': key[1],
+                        'distance': np.float32(distance), 'view_angle': np.float32(angle),
+                        'mutual': (key[1], key[0]) in seen,
+                    }
+            prev_tick = tick
+        rows.extend(open_runs.values())
+
+    return pd.DataFrame(rows)
+
+
+def same_onsets(expected, actual):
+    keys = ['round', 'observer_steamid', 'target_steamid', 'tick']
+    if len(expected) != len(actual):
+        return False
+    if len(expected) == 0:
+        return True
+    expected = expected.sort_values(keys).reset_index(drop=True)
+    actual = actual.sort_values(keys).reset_index(drop=True)
+    for col in ('round', 'tick', 'end_tick', 'observer_steamid', 'target_steamid', 'mutual'):
+        if not (expected[col].to_numpy().astype(np.int64) == actual[col].to_numpy().astype(np.int64)).all():
+            return False
+    for col in ('distance', 'view_angle'):
+        if not np.allclose(expected[col].to_numpy(np.float64), actual[col].to_numpy(np.float64), rtol=1e-6, atol=1e-4):
+            return False
+    return True
+
+
+def checker(rng):
+    if TRI_PATH is None:
+        return BoxChecker(synthetic_boxes(rng)), None
+    from awpy.visibility import VisibilityChecker
+    return VisibilityChecker(path=TRI_PATH), TRI_PATH
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    vc, tri_path = checker(rng)
+    print(f"Checker: {type(vc).__name__}" + (f" ({tri_path})" if tri_path else f" ({N_BOXES} boxes)"))
+
+    print(f"\n{'='*60}")
+    print(f"BRUTE-FORCE CHECK ({CHECK_ROUNDS} rounds x {CHECK_ROUND_SECONDS}s)")
+    print(f"{'='*60}")
+    small_df = synthetic_match(rng, CHECK_ROUNDS, CHECK_ROUND_SECONDS)
+    start = time.perf_counter()
+    expected = brute_force_onsets(small_df, vc)
+    brute_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    # a zero move threshold and a one-tick staleness limit recast every live pair on every tick
+    actual, pair_ticks, raycasts = sweep_match(small_df, vc, move_threshold=0.0, max_stale_ticks=1)
+    sweep_seconds = time.perf_counter() - start
+    print(f"Brute force: {len(expected)} onsets in {brute_seconds:.1f}s | sweep: {len(actual)} onsets, "
+          f"{raycasts} raycasts for {pair_ticks} pair ticks in {sweep_seconds:.1f}s")
+    print(f"Identical onsets: {same_onsets(expected, actual)}")
+
+    print(f"\n{'='*60}")
+    print(f"PER-DEMO TIMING ({N_ROUNDS} rounds x {ROUND_SECONDS}s, {N_PLAYERS} players, {SWEEP_WORKERS} workers)")
+    print(f"{'='*60}")
+    tick_df = synthetic_match(rng, N_ROUNDS, ROUND_SECONDS)
+    # pool workers build awpy's checker from the .tri file, so the box checker runs in-process
+    pool = worker_pool(SWEEP_WORKERS) if tri_path else None
+    start = time.perf_counter()
+    onsets, pair_ticks, raycasts = sweep_match(tick_df, vc, tri_path=tri_path, pool=pool)
+    seconds = time.perf_counter() - start
+    if pool is not None:
+        pool.shutdown()
+    print(f"{len(tick_df)} tick rows, {pair_ticks} enemy pair ticks")
+    print(f"Scheduled rays: {onsets.attrs['scheduled_rays']}, cast: {raycasts} ({1 - raycasts / pair_ticks:.1%} of pair ticks skipped)")
+    print(f"Onsets: {len(onsets)} | sweep time: {seconds:.1f}s ({seconds / raycasts * 1e6:.0f} us per cast ray)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from demolib.spotting import SEARCH_STRATEGIES, find_spotted_tick
+
+N_TRIALS = 3000
+MAX_TICKS = 200
+KILL_TICK = 1000
+FLICKER_SHARE = 0.03  # share of ticks hidden at random in non-monotone trials
+SEED = 1
+
+
+class ScriptedChecker:
+    # visibility per history index, stored in the x coordinate of the attacker's position
+    def __init__(self, visible):
+        self.visible = visible
+
+    def is_visible(self, start, end):
+        return bool(self.visible[int(start[0])])
+
+
+def synthetic_visibility(rng, n):
+    # half the trials see the victim up to a point and never before it (the case a
+    # coarse search is exact on), the rest flicker in and out of sight
+    if n and rng.random() < 0.5:
+        seen = rng.integers(0, n + 1)
+        return np.arange(n) < seen
+    return rng.random(n) >= FLICKER_SHARE
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    coarse = [strategy for strategy in SEARCH_STRATEGIES if strategy != "linear"]
+    casts = {(strategy, strict): 0 for strategy in SEARCH_STRATEGIES for strict in (False, True)}
+    monotone_trials = 0
+
+    for trial in range(N_TRIALS):
+        n = int(rng.integers(0, MAX_TICKS + 1))
+        visible = synthetic_visibility(rng, n)
+        ticks = np.arange(KILL_TICK, KILL_TICK - n, -1)
+        pos = np.zeros((n, 3))
+        pos[:, 0] = np.arange(n)
+        vc = ScriptedChecker(visible)
+        monotone = not (np.diff(visible.astype(np.int8)) > 0).any()
+        monotone_trials += monotone
+
+        expected = find_spotted_tick(vc, ticks, pos, pos, KILL_TICK + 1)
+        casts[("linear", False)] += expected[1]
+        for strategy in coarse:
+            for strict in (True, False):
+                actual = find_spotted_tick(vc, ticks, pos, pos, KILL_TICK + 1, strategy=strategy, strict=strict)
+                casts[(strategy, strict)] += actual[1]
+                # strict must always agree with linear; non-strict only when visibility is monotone
+                if (strict or monotone) and actual[::2] != expected[::2]:
+                    print(f"MISMATCH trial {trial}: {strategy} strict={strict} gave {actual}, linear gave {expected}")
+                    sys.exit(1)
+
+    print(f"{'='*60}")
+    print(f"Spotted tick search vs linear: {N_TRIALS} trials identical")
+    print(f"{'='*60}")
+    print(f"Strict: all {N_TRIALS} trials | non-strict: {monotone_trials} monotone trials")
+    print(f"Raycasts: linear {casts[('linear', False)]}" + "".join(
+        f" | {strategy} {casts[(strategy, False)]} (strict {casts[(strategy, True)]})" for strategy in coarse))
+
+if __name__ == "__main__":
+    main()
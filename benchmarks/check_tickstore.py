@@ -0,0 +1,99 @@
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from demolib.tickstore import TickStore, build_tick_store
+
+N_PLAYERS = 8
+N_TICKS = 4000
+N_KILLS = 3000
+LOOKBACK_TICKS = 192
+DROP_SHARE = 0.2  # share of each player's ticks missing (dead or not in the demo)
+SEED = 3
+
+
+def synthetic_alive_ticks(rng):
+    # players join and leave at different ticks, have holes in their ticks, and the
+    # whole demo has gaps (freeze time) where nobody has a row
+    steamids = 76561198000000000 + np.arange(N_PLAYERS, dtype=np.uint64) * 1024
+    frames = []
+    for steamid in steamids:
+        ticks = np.arange(rng.integers(0, 400), rng.integers(N_TICKS - 1200, N_TICKS))
+        ticks = ticks[rng.random(len(ticks)) > DROP_SHARE]
+        frames.append(pd.DataFrame({
+            'tick': ticks,
+            'steamid': steamid,
+            'X': rng.normal(0, 1000, len(ticks)).astype(np.float32),
+            'Y': rng.normal(0, 1000, len(ticks)).astype(np.float32),
+            'Z': rng.normal(0, 100, len(ticks)).astype(np.float32),
+        }))
+    tick_df = pd.concat(frames, ignore_index=True)
+    return tick_df[tick_df['tick'] % 500 > 50], steamids
+
+
+def merge_engagement(ticks_indexed, attacker_id, victim_id, start_tick, kill_tick):
+    # what the 1st-question scripts did before the tick store: slice the (tick, steamid)
+    # index, take both players and inner-join them on tick, newest first
+    try:
+        window_slice = ticks_indexed.loc[start_tick:kill_tick]
+        att_hist = window_slice.xs(attacker_id, level='steamid')
+        vic_hist = window_slice.xs(victim_id, level='steamid')
+    except KeyError:
+        return None
+    merged = pd.merge(att_hist, vic_hist, on='tick', suffixes=('_att', '_vic'), how='inner').sort_index(ascending=False)
+    ticks = merged.index.to_numpy()
+    att_pos = merged[['X_att', 'Y_att', 'Z_att']].to_numpy(dtype=np.float64)
+    vic_pos = merged[['X_vic', 'Y_vic', 'Z_vic']].to_numpy(dtype=np.float64)
+    return ticks, att_pos, vic_pos
+
+
+def same_engagement(expected, actual):
+    if expected is None or actual is None:
+        return expected is None and actual is None
+    return all(np.array_equal(np.asarray(e), np.asarray(a)) for e, a in zip(expected, actual))
+
+
+def main():
+    rng = np.random.default_rng(SEED)
+    tick_df, steamids = synthetic_alive_ticks(rng)
+
+    indexed = tick_df.copy()
+    indexed['steamid'] = indexed['steamid'].astype(float)
+    ticks_indexed = indexed.set_index(['tick', 'steamid']).sort_index()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TickStore(build_tick_store(tick_df, os.path.join(tmp, "store")).path)
+
+        # kills anywhere from before the first tick to past the last, between any two
+        # players (and one steamid that is not in the demo), with ids as float, int or str
+        missing = float(steamids[-1] + 1)
+        counts = {'rows': 0, 'empty': 0, 'skipped': 0}
+        for _ in range(N_KILLS):
+            attacker, victim = rng.choice(np.append(steamids.astype(float), missing), 2, replace=False)
+            kill_tick = int(rng.integers(-LOOKBACK_TICKS, N_TICKS + LOOKBACK_TICKS))
+            start_tick = kill_tick - LOOKBACK_TICKS
+
+            expected = merge_engagement(ticks_indexed, attacker, victim, start_tick, kill_tick)
+            for key in (float, int, lambda steamid: str(int(steamid))):
+                actual = store.engagement(key(attacker), key(victim), start_tick, kill_tick)
+                if not same_engagement(expected, actual):
+                    print(f"MISMATCH attacker {int(attacker)} victim {int(victim)} ticks {start_tick}..{kill_tick} ({key})")
+                    sys.exit(1)
+
+            if expected is None:
+                counts['skipped'] += 1
+            elif len(expected[0]) == 0:
+                counts['empty'] += 1
+            else:
+                counts['rows'] += 1
+
+    print(f"{'='*60}")
+    print(f"TickStore.engagement vs the old inner merge: {N_KILLS} kill windows identical")
+    print(f"{'='*60}")
+    print(f"With rows: {counts['rows']} | no shared tick: {counts['empty']} | skipped (KeyError): {counts['skipped']}")
+
+if __name__ == "__main__":
+    main()
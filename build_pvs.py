@@ -0,0 +1,31 @@
+import os
+import time
+from awpy.data import TRIS_DIR
+
+from demolib.pvs import CELL_SIZE, SAMPLES_PER_CELL, PVSGrid, build_pvs, pvs_grid_path
+
+MAPS = ["de_mirage"]
+WORKERS = os.cpu_count() or 1
+REBUILD = False
+
+def main():
+    for map_name in MAPS:
+        tri_path = TRIS_DIR / f"{map_name}.tri"
+
+        if not tri_path.exists():
+            print(f"Warning: .tri file for {map_name} not found, skipping...")
+            continue
+
+        grid_path = pvs_grid_path(map_name)
+        if os.path.exists(grid_path) and not REBUILD:
+            print(f"{map_name}: {PVSGrid(grid_path).summary()} (cached)")
+            continue
+
+        print(f"\nBuilding PVS grid for {map_name} ({CELL_SIZE:.0f}-unit cells, {SAMPLES_PER_CELL}x{SAMPLES_PER_CELL} rays per cell pair, {WORKERS} workers)...")
+        start = time.perf_counter()
+        grid = build_pvs(tri_path, grid_path, workers=WORKERS)
+        print(f"  {grid.summary()}")
+        print(f"  Built in {time.perf_counter() - start:.1f}s, saved to {grid_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import pandas as pd
+import os
+from demoparser2 import DemoParser
+
+from demolib.archives import demo_key, find_demo, local_demo
+from demolib.schema import load_ticks
+from demolib.tables import has_table, write_table
+
+BASE_PATH = r"F:\steam\steamapps\common\Counter-Strike Global Offensive\game\csgo\replays"
+
+DEMOS_AND_PLAYERS = [
+    ("match730_003784446263911514537_1478082598_187.dem", 76561198262157518, "arckay."),
+    ("match730_003784108645122310500_1981615639_411.dem", 76561198155980865, "KosyaK"),
+    ("match730_003783868685299483229_2047292477_192.dem", 76561198962223770, "patsan"),
+    ("match730_003788960304604381265_2009075138_192.dem", 76561198155980865, "KosyaK"),
+    ("match730_003788558291370508879_1730936726_187.dem", 76561198155980865, "KosyaK"),
+    ("match730_003790222312024835007_0827502415_272.dem", 76561198816184658, "Unknown"),
+    ("match730_003790275752155414789_0281693499_411.dem", 76561198816184658, "Unknown"),
+    ("match730_003790277747167723523_2066055668_187.dem", 76561198816184658, "Unknown"),
+    ("match730_003790301240638832694_0587072542_186.dem", 76561198816184658, "Unknown"),
+]
+
+TICK_PROPS = ["X", "Y", "Z", "pitch", "yaw", "team_num", "name", "is_alive", "active_weapon_name", "total_rounds_played"]
+
+EVENT_TABLES = {
+    "kills": "player_death",
+    "fires": "weapon_fire",
+    "hurts": "player_hurt",
+}
+
+def main():
+    for demo_file, tracked_steamid, player_name in DEMOS_AND_PLAYERS:
+        demo_path = find_demo(os.path.join(BASE_PATH, demo_file))
+        
+        if demo_path is None:
+            print(f"Warning: {demo_file} not found, skipping...")
+            continue
+        
+        print(f"\nCaching {demo_file}...")
+        
+        try:
+            parser = DemoParser(local_demo(demo_path))
+            map_name = parser.parse_header().get("map_name")
+            
+            if not has_table("ticks", demo_key(demo_path), map_name):
+                tick_df = load_ticks(parser, TICK_PROPS)
+                write_table("ticks", tick_df, demo_key(demo_path), map_name)
+                print(f"  ticks: {len(tick_df)} rows")
+                del tick_df
+            
+            for table, event in EVENT_TABLES.items():
+                if has_table(table, demo_key(demo_path), map_name):
+                    continue
+                event_df = pd.DataFrame(parser.parse_event(event))
+                write_table(table, event_df, demo_key(demo_path), map_name)
+                print(f"  {table}: {len(event_df)} rows")
+            
+        except Exception as e:
+            print(f"  Error caching {demo_file}: {e}")
+            continue
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+
+# stdlib only, so the client starts in milliseconds; the heavy imports live in analysis_worker.py
+WORKER_URL = "http://127.0.0.1:8765"
+TRACKED_STEAMIDS = [76561198262157518, 76561198155980865, 76561198962223770, 76561198816184658]
+DEFAULT_ANALYSES = ["kill_speed", "reaction", "kills"]
+
+def print_timing(title, result):
+    print(f"\n{title}:")
+    for group in ("tracked", "other"):
+        summary = result[group]
+        if summary['n']:
+            print(f"  {group:<8} n={summary['n']:<4} mean {summary['mean_ms']:.1f} ms, median {summary['median_ms']:.1f} ms")
+        else:
+            print(f"  {group:<8} n=0")
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python check_demo.py <demo path> [kill_speed,reaction,kills]")
+        return
+    
+    analyses = sys.argv[2].split(",") if len(sys.argv) > 2 else DEFAULT_ANALYSES
+    request = json.dumps({'demo': sys.argv[1], 'analyses': analyses, 'tracked': TRACKED_STEAMIDS}).encode()
+    
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(f"{WORKER_URL}/analyze", data=request, headers={"Content-Type": "application/json"})) as response:
+            result = json.load(response)
+    except urllib.error.HTTPError as e:
+        print(f"Error: {json.load(e).get('error', e.reason)}")
+        return
+    except urllib.error.URLError:
+        print(f"Error: no analysis worker at {WORKER_URL}, start it with: python analysis_worker.py")
+        return
+    elapsed = time.perf_counter() - start
+    
+    print(f"{result['demo']} on {result['map']}: {result['kills_total']} kills")
+    if 'kill_speed' in result:
+        print_timing("Kill speed", result['kill_speed'])
+    if 'reaction' in result:
+        print_timing("Reaction time", result['reaction'])
+    if 'kills' in result:
+        print("\nKills per attacker:")
+        for steamid, stats in sorted(result['kills']['per_player'].items(), key=lambda item: -item[1]['kills']):
+            marker = " *" if int(steamid) in TRACKED_STEAMIDS else ""
+            print(f"  {steamid}: {stats['kills']} kills, headshot {stats['headshot_ratio']:.2f}, thrusmoke {stats['thrusmoke_ratio']:.2f}{marker}")
+    
+    compute = result['compute_seconds']
+    print(f"\n{'cached result' if result['cached'] else f'computed in {compute:.2f}s'}, round trip {elapsed:.2f}s (overhead {max(elapsed - (0 if result['cached'] else compute), 0) * 1000:.0f} ms)")
+
+if __name__ == "__main__":
+    main()
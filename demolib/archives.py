@@ -0,0 +1,156 @@
+import bz2
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import threading
+
+from demolib.paths import cache_path, demo_stem
+
+CHUNK_BYTES = 4 * 1024 ** 2
+DEMO_CACHE_BUDGET_BYTES = 8 * 1024 ** 3  # decompressed archives kept in cache/demos, least recently used removed first
+
+
+def _open_zstd(path, mode="rb"):
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("reading .zst demos needs the zstandard package (pip install zstandard)")
+    return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+
+ARCHIVE_OPENERS = {
+    ".bz2": bz2.open,
+    ".gz": gzip.open,
+    ".xz": lzma.open,
+    ".zst": _open_zstd,
+}
+
+_index_lock = threading.Lock()
+
+
+def is_archive(path):
+    return os.path.splitext(path)[1].lower() in ARCHIVE_OPENERS
+
+
+def find_demo(path):
+    # the raw demo if it is there, otherwise the first archive of it
+    if os.path.exists(path):
+        return path
+    for suffix in ARCHIVE_OPENERS:
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return None
+
+
+def _index_path():
+    return cache_path("demos", "index.json")
+
+
+def _load_index():
+    try:
+        with open(_index_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def archive_hash(path):
+    # sha256 of the compressed bytes, remembered per (path, size, mtime) so an
+    # unchanged archive is only hashed once
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    with _index_lock:
+        digest = _load_index().get(key)
+    if digest:
+        return digest
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _index_lock:
+        index = _load_index()
+        index[key] = digest
+        tmp_path = f"{_index_path()}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, _index_path())
+    return digest
+
+
+def demo_key(path):
+    # what parsed caches (tick stores, tables) are keyed by: the archive's hash, so they
+    # outlive its decompressed copy and go stale when the archive changes, else the stem
+    return archive_hash(path) if is_archive(path) else demo_stem(path)
+
+
+def parser_path(path):
+    # the file the parser will actually read: an archive's decompressed copy while it is
+    # still cached, otherwise the path itself (local_demo will then read the archive)
+    if not is_archive(path):
+        return path
+    out_path = cache_path("demos", f"{archive_hash(path)}.dem")
+    return out_path if os.path.exists(out_path) else path
+
+
+def _evict_demos(keep, budget_bytes):
+    # oldest-used first until the decompressed copies fit the budget; a copy still
+    # open elsewhere (Windows refuses to remove it) is left for the next pass
+    demos_dir = os.path.dirname(keep)
+    entries = []
+    for name in os.listdir(demos_dir):
+        path = os.path.join(demos_dir, name)
+        if not name.endswith(".dem") or path == keep:
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+    total = os.path.getsize(keep) + sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= budget_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def local_demo(path, budget_bytes=DEMO_CACHE_BUDGET_BYTES):
+    # a path the parsers can open: raw demos as-is, archives decompressed with a
+    # fixed-size buffer into cache/demos/<sha256>.dem, which is kept under budget_bytes
+    if not is_archive(path):
+        return path
+
+    out_path = cache_path("demos", f"{archive_hash(path)}.dem")
+    if os.path.exists(out_path):
+        try:
+            os.utime(out_path)
+            return out_path
+        except OSError:
+            pass
+
+    tmp_path = f"{out_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    opener = ARCHIVE_OPENERS[os.path.splitext(path)[1].lower()]
+    buffer = bytearray(CHUNK_BYTES)
+    view = memoryview(buffer)
+    try:
+        with opener(path, "rb") as src, open(tmp_path, "wb") as dst:
+            while True:
+                n = src.readinto(view)
+                if not n:
+                    break
+                dst.write(view[:n])
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    _evict_demos(out_path, budget_bytes)
+    return out_path
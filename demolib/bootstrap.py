@@ -0,0 +1,93 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+N_RESAMPLES = 10_000
+CONFIDENCE = 0.95
+MAX_CHUNK_ELEMENTS = 4_000_000
+
+STATISTICS = {
+    "mean": np.mean,
+    "median": np.median,
+}
+
+
+def _chunk_rows(n_values):
+    return max(1, MAX_CHUNK_ELEMENTS // max(n_values, 1))
+
+
+def _bootstrap_diffs(a, b, statistic, n_resamples, seed):
+    stat = STATISTICS[statistic]
+    rng = np.random.default_rng(seed)
+    chunk = _chunk_rows(len(a) + len(b))
+    diffs = np.empty(n_resamples)
+
+    for start in range(0, n_resamples, chunk):
+        rows = min(chunk, n_resamples - start)
+        a_idx = rng.integers(0, len(a), size=(rows, len(a)))
+        b_idx = rng.integers(0, len(b), size=(rows, len(b)))
+        diffs[start:start + rows] = stat(a[a_idx], axis=1) - stat(b[b_idx], axis=1)
+
+    return diffs
+
+
+def _permutation_diffs(a, b, statistic, n_resamples, seed):
+    stat = STATISTICS[statistic]
+    rng = np.random.default_rng(seed)
+    pooled = np.concatenate([a, b])
+    chunk = _chunk_rows(len(pooled))
+    diffs = np.empty(n_resamples)
+
+    for start in range(0, n_resamples, chunk):
+        rows = min(chunk, n_resamples - start)
+        shuffled = pooled[np.argsort(rng.random((rows, len(pooled))), axis=1)]
+        diffs[start:start + rows] = stat(shuffled[:, :len(a)], axis=1) - stat(shuffled[:, len(a):], axis=1)
+
+    return diffs
+
+
+def _run(fn, a, b, statistic, n_resamples, seed, workers):
+    if workers <= 1:
+        return fn(a, b, statistic, n_resamples, seed)
+
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    sizes = [n_resamples // workers + (1 if i < n_resamples % workers else 0) for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parts = executor.map(fn, [a] * workers, [b] * workers, [statistic] * workers, sizes, seeds)
+        return np.concatenate(list(parts))
+
+
+def compare_groups(a, b, statistic="mean", n_resamples=N_RESAMPLES, confidence=CONFIDENCE, seed=0, workers=1):
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    if len(a) < 2 or len(b) < 2:
+        return None
+
+    stat = STATISTICS[statistic]
+    observed = stat(a) - stat(b)
+
+    boot = _run(_bootstrap_diffs, a, b, statistic, n_resamples, seed, workers)
+    alpha = (1 - confidence) / 2
+    ci_low, ci_high = np.quantile(boot, [alpha, 1 - alpha])
+
+    perm = _run(_permutation_diffs, a, b, statistic, n_resamples, seed + 1, workers)
+    p_value = (np.count_nonzero(np.abs(perm) >= abs(observed)) + 1) / (n_resamples + 1)
+
+    return {
+        'statistic': statistic,
+        'observed_diff': observed,
+        'ci_low': ci_low,
+        'ci_high': ci_high,
+        'confidence': confidence,
+        'p_value': p_value,
+        'n_a': len(a),
+        'n_b': len(b),
+    }
+
+
+def format_comparison(label, result, unit=""):
+    if result is None:
+        return f"{label}: not enough data"
+    return (f"{label} ({result['statistic']}): {result['observed_diff']:.2f}{unit} "
+            f"[{result['confidence']:.0%} CI {result['ci_low']:.2f} to {result['ci_high']:.2f}] "
+            f"permutation p = {result['p_value']:.4f}")
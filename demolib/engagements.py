@@ -0,0 +1,145 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from demolib.pvs import PVSGrid, PVSVisibility
+from demolib.spotting import find_spotted_tick
+from demolib.tickstore import TickStore
+
+CHUNKS_PER_SHARD = 4
+
+_worker_stores = {}
+_worker_checkers = {}
+
+
+def kill_list(kills_df):
+    kills = []
+    for _, kill in kills_df.iterrows():
+        kills.append((
+            float(kill.get('attacker_steamid', 0)),
+            float(kill.get('user_steamid', 0)),
+            int(kill.get('tick', 0)),
+            kill.get('attacker_steamid'),
+            kill.get('user_steamid'),
+        ))
+    return kills
+
+
+def fire_ticks_by_player(fires_df):
+    if len(fires_df) == 0:
+        return {}
+    steamids = fires_df['user_steamid'].astype(float)
+    return {steamid: np.sort(group['tick'].to_numpy()) for steamid, group in fires_df.groupby(steamids)}
+
+
+def analyze_kills(kills, store, vc, lookback_ticks, fires=None, strategy="linear", strict=False):
+    engagements = []
+
+    for attacker_id, victim_id, kill_tick, attacker_raw, victim_raw in kills:
+        if not attacker_id or not victim_id or attacker_id == victim_id:
+            continue
+
+        engagement = store.engagement(attacker_id, victim_id, kill_tick - lookback_ticks, kill_tick)
+        if engagement is None:
+            continue
+
+        ticks, att_pos, vic_pos = engagement
+        avoided_before = getattr(vc, 'avoided', 0)
+        mismatches_before = getattr(vc, 'mismatches', 0)
+        spotted_tick, raycasts, linear_raycasts = find_spotted_tick(
+            vc, ticks, att_pos, vic_pos, kill_tick, strategy=strategy, strict=strict
+        )
+
+        first_shot_tick = None
+        if fires is not None and attacker_id in fires:
+            attacker_fires = fires[attacker_id]
+            i = np.searchsorted(attacker_fires, spotted_tick, side='left')
+            if i < len(attacker_fires) and attacker_fires[i] <= kill_tick:
+                first_shot_tick = int(attacker_fires[i])
+
+        engagements.append({
+            'attacker_id': attacker_id,
+            'attacker_steamid': attacker_raw,
+            'victim_steamid': victim_raw,
+            'tick': kill_tick,
+            'spotted_tick': spotted_tick,
+            'first_shot_tick': first_shot_tick,
+            'raycasts': raycasts,
+            'linear_raycasts': linear_raycasts,
+            'raycasts_avoided': getattr(vc, 'avoided', 0) - avoided_before,
+            'pvs_mismatches': getattr(vc, 'mismatches', 0) - mismatches_before,
+        })
+
+    return engagements
+
+
+def checker_spec(vc, tri_path):
+    # what a worker needs to rebuild vc: the .tri file, plus the PVS grid when vc wraps one
+    if isinstance(vc, PVSVisibility):
+        return str(tri_path), vc.grid.path, vc.verify
+    return str(tri_path), None, False
+
+
+def worker_checker(tri_path, pvs_path=None, pvs_verify=False):
+    # each worker builds a map's BVH the first time it sees the map and keeps it for later demos
+    key = (tri_path, pvs_path, pvs_verify)
+    if key not in _worker_checkers:
+        from awpy.visibility import VisibilityChecker
+        vc = VisibilityChecker(path=tri_path)
+        if pvs_path is not None:
+            vc = PVSVisibility(vc, PVSGrid(pvs_path), verify=pvs_verify)
+        _worker_checkers[key] = vc
+    return _worker_checkers[key]
+
+
+def _worker_store(path):
+    if path not in _worker_stores:
+        _worker_stores[path] = TickStore(path)
+    return _worker_stores[path]
+
+
+def _analyze_chunk(args):
+    store_path, spec, kills, lookback_ticks, fires, strategy, strict = args
+    return analyze_kills(kills, _worker_store(store_path), worker_checker(*spec), lookback_ticks, fires, strategy, strict)
+
+
+def _start_method():
+    # forking a process that is running other threads can deadlock in the child
+    if "fork" in multiprocessing.get_all_start_methods() and threading.active_count() == 1:
+        return "fork"
+    return "spawn"
+
+
+def worker_pool(workers):
+    # one pool for the whole run, created before the script starts any threads and
+    # reused for every demo; None when work should stay in-process
+    if workers <= 1:
+        return None
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(_start_method()))
+    # a fork pool launches all of its workers on the first submit, so do that now while
+    # this is still the only thread
+    pool.submit(int).result()
+    return pool
+
+
+def analyze_kills_sharded(kills, store, tri_path, lookback_ticks, shards, fires=None, strategy="linear", strict=False, vc=None, pool=None):
+    if pool is None or shards <= 1 or len(kills) < 2:
+        return analyze_kills(kills, store, vc, lookback_ticks, fires, strategy, strict)
+
+    spec = checker_spec(vc, tri_path)
+    n_chunks = min(len(kills), shards * CHUNKS_PER_SHARD)
+    chunks = [kills[i::n_chunks] for i in range(n_chunks)]
+    tasks = []
+    for chunk in chunks:
+        chunk_fires = None
+        if fires is not None:
+            chunk_fires = {k[0]: fires[k[0]] for k in chunk if k[0] in fires}
+        tasks.append((store.path, spec, chunk, lookback_ticks, chunk_fires, strategy, strict))
+
+    results = list(pool.map(_analyze_chunk, tasks))
+
+    engagements = [e for chunk_result in results for e in chunk_result]
+    engagements.sort(key=lambda e: (e['tick'], e['attacker_id']))
+    return engagements
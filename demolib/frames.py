@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+from demolib.schema import steamid_series
+
+BACKENDS = ("pandas", "polars")
+
+
+def _check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown dataframe backend: {backend}")
+
+
+def _lazy(df, columns):
+    import polars as pl
+
+    return pl.from_pandas(df[list(columns)]).lazy()
+
+
+def active_ticks(game_state_df, flags, backend="pandas"):
+    _check_backend(backend)
+    if backend == "polars":
+        import polars as pl
+
+        # a null flag is excluded, matching pandas' `== False`
+        condition = pl.all_horizontal([pl.col(flag).eq(False).fill_null(False) for flag in flags])
+        plan = _lazy(game_state_df, ["tick"] + list(flags)).filter(condition).select("tick").unique(maintain_order=True)
+        return plan.collect()["tick"].to_numpy()
+
+    mask = np.ones(len(game_state_df), dtype=bool)
+    for flag in flags:
+        mask &= (game_state_df[flag] == False).to_numpy(dtype=bool, na_value=False)
+    return game_state_df.loc[mask, 'tick'].unique()
+
+
+def attach_firing(tick_df, fires_df, backend="pandas"):
+    _check_backend(backend)
+    if len(fires_df) > 0:
+        fires_df = fires_df[['tick', 'user_steamid', 'weapon']].copy()
+        fires_df['user_steamid'] = fires_df['user_steamid'].astype(str)
+        is_gun_fire = ~fires_df['weapon'].str.contains('knife', case=False, na=False)
+        gun_fires = fires_df.loc[is_gun_fire, ['tick', 'user_steamid']]
+    else:
+        gun_fires = pd.DataFrame({'tick': pd.Series(dtype=tick_df['tick'].dtype), 'user_steamid': pd.Series(dtype=str)})
+
+    if backend == "polars":
+        import polars as pl
+
+        ticks_plan = pl.from_pandas(tick_df).lazy().with_columns(pl.col("steamid").cast(pl.String).alias("steamid_str"))
+        fires_plan = pl.from_pandas(gun_fires).lazy().select(
+            pl.col("tick").cast(ticks_plan.collect_schema()["tick"]),
+            pl.col("user_steamid").alias("steamid_str"),
+            pl.lit(True).alias("is_firing"),
+        )
+        plan = (
+            ticks_plan
+            .join(fires_plan, on=["tick", "steamid_str"], how="left", maintain_order="left")
+            .with_columns(pl.col("is_firing").fill_null(False))
+        )
+        return plan.collect().to_pandas()
+
+    tick_df = tick_df.copy()
+    tick_df['steamid_str'] = tick_df['steamid'].astype(str)
+    gun_fires = gun_fires.copy()
+    gun_fires['is_firing'] = True
+    tick_df = tick_df.merge(gun_fires, left_on=['tick', 'steamid_str'], right_on=['tick', 'user_steamid'], how='left')
+    tick_df = tick_df.drop(columns=['user_steamid'])
+    tick_df['is_firing'] = tick_df['is_firing'].fillna(False).astype(bool)
+    return tick_df
+
+
+def weapon_usage(tick_df, fires_df, hurts_df, backend="pandas"):
+    # one row per (steamid, weapon held while alive) with ticks held, shots fired and hits;
+    # tick_df may also be runs from demolib.runs, whose n_ticks are summed
+    _check_backend(backend)
+    held = tick_df[['steamid', 'name', 'is_alive', 'active_weapon_name']].copy()
+    held['n_ticks'] = tick_df['n_ticks'] if 'n_ticks' in tick_df.columns else 1
+
+    events = []
+    for df, steamid_col in ((fires_df, 'user_steamid'), (hurts_df, 'attacker_steamid')):
+        if len(df) == 0:
+            events.append(pd.DataFrame({'steamid': pd.Series(dtype=np.uint64), 'weapon': pd.Series(dtype=object)}))
+            continue
+        event = pd.DataFrame({'steamid': steamid_series(df[steamid_col]), 'weapon': df['weapon'].astype(object)})
+        events.append(event.dropna(subset=['steamid']).astype({'steamid': np.uint64}))
+    fires, hurts = events
+
+    if backend == "polars":
+        import polars as pl
+
+        held_plan = (
+            pl.from_pandas(held).lazy()
+            .filter(pl.col("is_alive").eq(True).fill_null(False) & pl.col("active_weapon_name").is_not_null())
+        )
+        names = (
+            held_plan.group_by("steamid", maintain_order=True)
+            .agg(pl.col("name").first().cast(pl.String).alias("player_name"))
+        )
+        ticks_held = (
+            held_plan.group_by(["steamid", "active_weapon_name"], maintain_order=True)
+            .agg(pl.col("n_ticks").sum().alias("ticks_held"))
+            .select("steamid", pl.col("active_weapon_name").cast(pl.String).alias("weapon"), "ticks_held")
+        )
+        shots = pl.from_pandas(fires).lazy().group_by(["steamid", "weapon"]).agg(pl.len().alias("shots_fired"))
+        hits = pl.from_pandas(hurts).lazy().group_by(["steamid", "weapon"]).agg(pl.len().alias("shots_hit"))
+        plan = (
+            ticks_held
+            .join(shots, on=["steamid", "weapon"], how="left", maintain_order="left")
+            .join(hits, on=["steamid", "weapon"], how="left", maintain_order="left")
+            .join(names, on="steamid", how="left", maintain_order="left")
+            .with_columns(pl.col("shots_fired").fill_null(0), pl.col("shots_hit").fill_null(0))
+            .select("steamid", "weapon", "ticks_held", "shots_fired", "shots_hit", "player_name")
+        )
+        usage = plan.collect().to_pandas()
+        return usage.astype({'steamid': np.uint64, 'ticks_held': np.int64, 'shots_fired': np.int64, 'shots_hit': np.int64})
+
+    held = held[(held['is_alive'] == True) & held['active_weapon_name'].notna()]
+    names = held.groupby('steamid', sort=False)['name'].first().astype(object).rename('player_name')
+    usage = held.groupby(['steamid', 'active_weapon_name'], sort=False, observed=True)['n_ticks'].sum().rename('ticks_held').reset_index()
+    usage = usage.rename(columns={'active_weapon_name': 'weapon'})
+    usage['weapon'] = usage['weapon'].astype(object)
+    shots = fires.groupby(['steamid', 'weapon']).size().rename('shots_fired').reset_index()
+    hits = hurts.groupby(['steamid', 'weapon']).size().rename('shots_hit').reset_index()
+    usage = usage.merge(shots, on=['steamid', 'weapon'], how='left').merge(hits, on=['steamid', 'weapon'], how='left')
+    usage = usage.merge(names, left_on='steamid', right_index=True, how='left')
+    usage[['shots_fired', 'shots_hit']] = usage[['shots_fired', 'shots_hit']].fillna(0).astype(np.int64)
+    return usage[['steamid', 'weapon', 'ticks_held', 'shots_fired', 'shots_hit', 'player_name']]
+
+
+def bin_time(player_data, bin_size, columns, backend="pandas"):
+    _check_backend(backend)
+    if backend == "polars":
+        import polars as pl
+
+        plan = (
+            _lazy(player_data, ["time_in_round"] + list(columns))
+            .with_columns(((pl.col("time_in_round") // bin_size) * bin_size).alias("time_bin"))
+            .drop_nulls("time_bin")
+            .group_by("time_bin")
+            .agg([pl.col(col).mean() for col in columns])
+            .sort("time_bin")
+        )
+        return plan.collect().to_pandas()
+
+    binned = player_data[['time_in_round'] + list(columns)].copy()
+    binned['time_bin'] = (binned['time_in_round'] // bin_size) * bin_size
+    return binned.groupby('time_bin')[list(columns)].mean().reset_index()
@@ -0,0 +1,14 @@
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get("DEMO_CACHE_DIR", os.path.join(REPO_ROOT, "cache"))
+
+
+def cache_path(*parts):
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def demo_stem(demo_file):
+    return os.path.basename(demo_file).split(".")[0]
@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+
+from demolib.archives import find_demo, parser_path
+
+PREFETCH_DEPTH = 2
+PREFETCH_BUDGET_BYTES = 2 * 1024 ** 3
+CHUNK_BYTES = 8 * 1024 ** 2
+
+
+class DemoPrefetcher:
+    # warms the OS page cache for the next demos on a background thread, so the
+    # parser (which only takes a path) finds them in memory instead of on the disk.
+    # resolve maps each path to the file actually read and runs on the prefetch thread
+    def __init__(self, paths, depth=PREFETCH_DEPTH, budget_bytes=PREFETCH_BUDGET_BYTES, chunk_bytes=CHUNK_BYTES, resolve=None):
+        self.paths = list(paths)
+        self.resolve = resolve
+        self.depth = depth
+        self.budget_bytes = budget_bytes
+        self.chunk_bytes = chunk_bytes
+        self.stats = {path: {'bytes': 0, 'read_seconds': 0.0, 'wait_seconds': 0.0} for path in self.paths}
+        self._ready = {path: threading.Event() for path in self.paths}
+        self._cond = threading.Condition()
+        self._warm = {}
+        self._consumed = 0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+        for event in self._ready.values():
+            event.set()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _can_read(self, index, size):
+        if index - self._consumed > self.depth:
+            return False
+        # always allow one demo, even if it alone is over budget
+        return not self._warm or sum(self._warm.values()) + size <= self.budget_bytes
+
+    def _run(self):
+        buffer = bytearray(self.chunk_bytes)
+        for index, path in enumerate(self.paths):
+            try:
+                read_path = self.resolve(path) if self.resolve else path
+                size = os.path.getsize(read_path)
+            except OSError:
+                size = 0
+            with self._cond:
+                while not self._stopped and not self._can_read(index, size):
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                if size:
+                    self._warm[path] = size
+
+            if size:
+                start = time.perf_counter()
+                try:
+                    with open(read_path, "rb", buffering=0) as f:
+                        view = memoryview(buffer)
+                        while not self._stopped and f.readinto(view):
+                            pass
+                except OSError:
+                    pass
+                self.stats[path]['bytes'] = size
+                self.stats[path]['read_seconds'] = time.perf_counter() - start
+            self._ready[path].set()
+
+    def wait(self, path):
+        # reaching a demo releases every demo before it, including ones skipped or failed
+        index = self.paths.index(path)
+        with self._cond:
+            self._consumed = max(self._consumed, index)
+            for earlier in self.paths[:index]:
+                self._warm.pop(earlier, None)
+            self._cond.notify_all()
+
+        start = time.perf_counter()
+        self._ready[path].wait()
+        waited = time.perf_counter() - start
+        self.stats[path]['wait_seconds'] = waited
+        return waited
+
+    def report(self, path):
+        stats = self.stats[path]
+        mb = stats['bytes'] / 1024 ** 2
+        rate = mb / stats['read_seconds'] if stats['read_seconds'] > 0 else 0.0
+        return f"I/O wait {stats['wait_seconds']:.2f}s (prefetched {mb:.0f} MB in {stats['read_seconds']:.2f}s, {rate:.0f} MB/s)"
+
+    def summary(self, wall_seconds):
+        waited = sum(s['wait_seconds'] for s in self.stats.values())
+        total_mb = sum(s['bytes'] for s in self.stats.values()) / 1024 ** 2
+        share = waited / wall_seconds * 100 if wall_seconds > 0 else 0.0
+        return f"Prefetched {total_mb:.0f} MB, total I/O wait {waited:.2f}s of {wall_seconds:.2f}s ({share:.1f}%)"
+
+
+def prefetch_demos(paths, depth=PREFETCH_DEPTH, budget_bytes=PREFETCH_BUDGET_BYTES):
+    # started prefetcher keyed by find_demo's path for each demo that exists. It reads
+    # what the parser will open, an archive's decompressed copy when that is cached or
+    # else the archive, and hashing the archive to find out happens on the prefetch thread
+    demo_paths = [path for path in (find_demo(path) for path in paths) if path]
+    return DemoPrefetcher(demo_paths, depth, budget_bytes, resolve=parser_path).start()
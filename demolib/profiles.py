@@ -0,0 +1,167 @@
+import math
+import sqlite3
+
+import numpy as np
+
+from demolib.paths import cache_path
+
+SKETCH_BIN_MS = 10.0
+SKETCH_MAX_MS = 5000.0
+SKETCH_BINS = int(SKETCH_MAX_MS / SKETCH_BIN_MS) + 1  # last bin holds everything above the max
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed (
+    demo TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    PRIMARY KEY (demo, analysis)
+);
+CREATE TABLE IF NOT EXISTS counters (
+    steamid INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (steamid, metric)
+);
+CREATE TABLE IF NOT EXISTS sketches (
+    steamid INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    m2 REAL NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    hist BLOB NOT NULL,
+    PRIMARY KEY (steamid, metric)
+);
+"""
+
+RATIOS = {
+    'headshot_ratio': ('headshots', 'kills'),
+    'thrusmoke_ratio': ('thrusmoke_kills', 'kills'),
+    'accuracy': ('shots_hit', 'shots_fired'),
+}
+
+
+def profile_db_path():
+    return cache_path("profiles.sqlite")
+
+
+def _histogram(values):
+    bins = np.minimum((np.asarray(values, dtype=np.float64) / SKETCH_BIN_MS).astype(np.int64), SKETCH_BINS - 1)
+    return np.bincount(np.maximum(bins, 0), minlength=SKETCH_BINS).astype(np.int64)
+
+
+def sketch_quantile(hist, q):
+    cumulative = np.cumsum(hist)
+    if cumulative[-1] == 0:
+        return float("nan")
+    i = int(np.searchsorted(cumulative, q * cumulative[-1]))
+    return (i + 0.5) * SKETCH_BIN_MS
+
+
+class ProfileStore:
+    # running per-steamid aggregates, updated once per (demo, analysis)
+    def __init__(self, path=None):
+        self.path = path or profile_db_path()
+        self.con = sqlite3.connect(self.path, timeout=60)
+        self.con.executescript(SCHEMA)
+
+    def close(self):
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_processed(self, demo, analysis):
+        row = self.con.execute("SELECT 1 FROM processed WHERE demo = ? AND analysis = ?", (demo, analysis)).fetchone()
+        return row is not None
+
+    def record_demo(self, demo, analysis, counters=None, samples=None):
+        # counters: {steamid: {metric: value}}, samples: {steamid: {metric: [values]}};
+        # returns False without touching anything if this demo was already recorded
+        with self.con:
+            try:
+                self.con.execute("INSERT INTO processed (demo, analysis) VALUES (?, ?)", (demo, analysis))
+            except sqlite3.IntegrityError:
+                return False
+
+            for steamid, metrics in (counters or {}).items():
+                for metric, value in metrics.items():
+                    self.con.execute(
+                        "INSERT INTO counters (steamid, metric, value) VALUES (?, ?, ?) "
+                        "ON CONFLICT (steamid, metric) DO UPDATE SET value = value + excluded.value",
+                        (int(steamid), metric, float(value)),
+                    )
+
+            for steamid, metrics in (samples or {}).items():
+                for metric, values in metrics.items():
+                    if len(values):
+                        self._merge_sketch(int(steamid), metric, np.asarray(values, dtype=np.float64))
+        return True
+
+    def _merge_sketch(self, steamid, metric, values):
+        n_b = len(values)
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        hist_b = _histogram(values)
+
+        row = self.con.execute(
+            "SELECT n, mean, m2, min, max, hist FROM sketches WHERE steamid = ? AND metric = ?", (steamid, metric)
+        ).fetchone()
+        if row is None:
+            n, mean, m2, lo, hi, hist = n_b, mean_b, m2_b, float(values.min()), float(values.max()), hist_b
+        else:
+            # Chan et al. pairwise combine of two Welford states
+            n_a, mean_a, m2_a, lo, hi, hist_a = row
+            n = n_a + n_b
+            delta = mean_b - mean_a
+            mean = mean_a + delta * n_b / n
+            m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+            lo = min(lo, float(values.min()))
+            hi = max(hi, float(values.max()))
+            hist = np.frombuffer(hist_a, dtype=np.int64) + hist_b
+
+        self.con.execute(
+            "INSERT OR REPLACE INTO sketches (steamid, metric, n, mean, m2, min, max, hist) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (steamid, metric, n, mean, m2, lo, hi, hist.tobytes()),
+        )
+
+    def profile(self, steamid):
+        steamid = int(steamid)
+        counters = dict(self.con.execute("SELECT metric, value FROM counters WHERE steamid = ?", (steamid,)).fetchall())
+
+        profile = {'steamid': steamid, **counters}
+        for ratio, (num, den) in RATIOS.items():
+            if counters.get(den):
+                profile[ratio] = counters.get(num, 0.0) / counters[den]
+
+        for metric, n, mean, m2, lo, hi, hist in self.con.execute(
+            "SELECT metric, n, mean, m2, min, max, hist FROM sketches WHERE steamid = ?", (steamid,)
+        ):
+            hist = np.frombuffer(hist, dtype=np.int64)
+            profile[metric] = {
+                'n': n,
+                'mean': mean,
+                'std': math.sqrt(m2 / (n - 1)) if n > 1 else float("nan"),
+                'min': lo,
+                'max': hi,
+                'median': sketch_quantile(hist, 0.5),
+                'p10': sketch_quantile(hist, 0.1),
+                'p90': sketch_quantile(hist, 0.9),
+            }
+        return profile if len(profile) > 1 else None
+
+    def steamids(self):
+        rows = self.con.execute("SELECT steamid FROM counters UNION SELECT steamid FROM sketches ORDER BY steamid")
+        return [row[0] for row in rows]
+
+
+def steamid_key(value):
+    # event steamids arrive as digit strings or ints; anything else (world, bots) has no profile
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
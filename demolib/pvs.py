@@ -0,0 +1,256 @@
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from demolib.paths import cache_path
+from demolib.spotting import EYE_HEIGHT
+
+CELL_SIZE = 256.0
+CELL_HEIGHT = 128.0
+SAMPLES_PER_CELL = 8
+FLOOR_NORMAL_Z = 0.7
+PAIRS_PER_TASK = 2000
+TRUST_MIN_CHECKS = 10_000  # grid answers verified against raycasts, with no mismatch, before exact runs use them
+
+_worker_vc = None
+_verify_lock = threading.Lock()
+
+
+def pvs_grid_path(map_name, cell_size=CELL_SIZE, samples=SAMPLES_PER_CELL):
+    return cache_path("pvs", f"{map_name}.c{int(cell_size)}.k{samples}.npz")
+
+
+def read_triangles(tri_path):
+    # a .tri file is a flat run of float32 (x, y, z) * 3 per triangle
+    return np.fromfile(tri_path, dtype=np.float32).reshape(-1, 3, 3).astype(np.float64)
+
+
+def cell_keys(points, cell_size=CELL_SIZE, cell_height=CELL_HEIGHT):
+    points = np.asarray(points, dtype=np.float64)
+    scale = np.array([cell_size, cell_size, cell_height])
+    return np.floor(points / scale).astype(np.int32)
+
+
+def _spread_sample(points, samples):
+    # farthest-point sampling: start from the point farthest from the middle, then keep
+    # adding the point farthest from everything chosen, so the samples span the cell
+    chosen = [int(np.argmax(np.linalg.norm(points - points.mean(axis=0), axis=1)))]
+    nearest = np.linalg.norm(points - points[chosen[0]], axis=1)
+    while len(chosen) < min(samples, len(points)):
+        chosen.append(int(np.argmax(nearest)))
+        nearest = np.minimum(nearest, np.linalg.norm(points - points[chosen[-1]], axis=1))
+    return points[chosen]
+
+
+def walkable_cells(triangles, samples=SAMPLES_PER_CELL, cell_size=CELL_SIZE, cell_height=CELL_HEIGHT):
+    # cells are keyed on eye positions above upward-facing triangles; each cell
+    # keeps up to `samples` of those eye positions, spread across it, to cast rays from
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    keep = lengths > 0
+    floor = triangles[keep][np.abs(normals[keep, 2] / lengths[keep]) >= FLOOR_NORMAL_Z]
+
+    eyes = floor.mean(axis=1)
+    eyes[:, 2] += EYE_HEIGHT
+    keys = cell_keys(eyes, cell_size, cell_height)
+    cells, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.searchsorted(inverse[order], np.arange(len(cells) + 1))
+    sample_points = np.full((len(cells), samples, 3), np.nan)
+    for i in range(len(cells)):
+        chosen = _spread_sample(eyes[order[bounds[i]:bounds[i + 1]]], samples)
+        sample_points[i, :len(chosen)] = chosen
+
+    return cells, sample_points
+
+
+def neighbour_cells(cells):
+    # (27, n) index of each cell's neighbour at every offset in its 3x3x3 block, -1 where
+    # that neighbour is not walkable; offset 13 is the cell itself
+    index = {tuple(int(v) for v in key): i for i, key in enumerate(cells)}
+    offsets = np.array([(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)])
+    neighbours = np.full((len(offsets), len(cells)), -1, dtype=np.int64)
+    for o, offset in enumerate(offsets):
+        for i, key in enumerate(cells + offset):
+            neighbours[o, i] = index.get((int(key[0]), int(key[1]), int(key[2])), -1)
+    return neighbours
+
+
+def demote_boundaries(decided, neighbours):
+    # a pair keeps its class only if moving either end into any neighbouring walkable
+    # cell gives the same class; a sampled pair next to a change is too close to trust
+    kept = decided.copy()
+    for idx in neighbours:
+        valid = idx >= 0
+        kept[valid, :] &= decided[idx[valid], :]
+        kept[:, valid] &= decided[:, idx[valid]]
+    return kept
+
+
+def _init_worker(tri_path):
+    global _worker_vc
+    from awpy.visibility import VisibilityChecker
+    _worker_vc = VisibilityChecker(path=tri_path)
+
+
+def _classify_pairs(args):
+    pairs, sample_points = args
+    # 0 never, 1 always, 2 mixed
+    classes = np.empty(len(pairs), dtype=np.uint8)
+    for n, (i, j) in enumerate(pairs):
+        seen = hidden = False
+        for p1 in sample_points[i]:
+            if np.isnan(p1[0]):
+                continue
+            for p2 in sample_points[j]:
+                if np.isnan(p2[0]):
+                    continue
+                if _worker_vc.is_visible(tuple(p1), tuple(p2)):
+                    seen = True
+                else:
+                    hidden = True
+            if seen and hidden:
+                break
+        classes[n] = 2 if seen and hidden else (1 if seen else 0)
+    return classes
+
+
+def build_pvs(tri_path, path, samples=SAMPLES_PER_CELL, cell_size=CELL_SIZE, cell_height=CELL_HEIGHT, workers=1):
+    cells, sample_points = walkable_cells(read_triangles(tri_path), samples, cell_size, cell_height)
+    n = len(cells)
+    i_idx, j_idx = np.triu_indices(n, k=1)
+    pairs = np.column_stack([i_idx, j_idx])
+
+    tasks = [(pairs[start:start + PAIRS_PER_TASK], sample_points) for start in range(0, len(pairs), PAIRS_PER_TASK)]
+    if workers <= 1:
+        _init_worker(tri_path)
+        classes = np.concatenate([_classify_pairs(task) for task in tasks]) if tasks else np.empty(0, dtype=np.uint8)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(tri_path),)) as executor:
+            classes = np.concatenate(list(executor.map(_classify_pairs, tasks))) if tasks else np.empty(0, dtype=np.uint8)
+
+    always = np.zeros((n, n), dtype=bool)
+    never = np.zeros((n, n), dtype=bool)
+    always[i_idx, j_idx] = always[j_idx, i_idx] = classes == 1
+    never[i_idx, j_idx] = never[j_idx, i_idx] = classes == 0
+    neighbours = neighbour_cells(cells)
+    always = demote_boundaries(always, neighbours)
+    never = demote_boundaries(never, neighbours)
+
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        cells=cells,
+        cell_size=np.array([cell_size, cell_height]),
+        always=np.packbits(always, axis=None),
+        never=np.packbits(never, axis=None),
+    )
+    os.replace(tmp_path, path)
+    # a rebuilt grid has to earn trust again
+    if os.path.exists(verification_path(path)):
+        os.remove(verification_path(path))
+    return PVSGrid(path)
+
+
+def verification_path(grid_path):
+    return grid_path + ".verify.json"
+
+
+class PVSGrid:
+    def __init__(self, path):
+        self.path = path
+        with np.load(path) as data:
+            self.cells = data["cells"]
+            self.cell_size, self.cell_height = (float(v) for v in data["cell_size"])
+            self.always = data["always"]
+            self.never = data["never"]
+        self.n = len(self.cells)
+        self._index = {tuple(int(v) for v in key): i for i, key in enumerate(self.cells)}
+
+    def cell(self, point):
+        key = cell_keys(point, self.cell_size, self.cell_height)
+        return self._index.get((int(key[0]), int(key[1]), int(key[2])))
+
+    def _bit(self, bits, i, j):
+        k = i * self.n + j
+        return bool((bits[k >> 3] >> (7 - (k & 7))) & 1)
+
+    def lookup(self, p1, p2):
+        # True / False when the cell pair decides it, None when a raycast is needed
+        i = self.cell(p1)
+        j = self.cell(p2)
+        if i is None or j is None or i == j:
+            return None
+        if self._bit(self.always, i, j):
+            return True
+        if self._bit(self.never, i, j):
+            return False
+        return None
+
+    def verification(self):
+        # decided answers checked against a raycast in PVS_VERIFY runs, and how many were wrong
+        try:
+            with open(verification_path(self.path)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'checks': 0, 'mismatches': 0}
+
+    @property
+    def trusted(self):
+        # exact runs may take the grid's answers without a raycast only once verify runs
+        # have checked enough of them and never found one wrong
+        verified = self.verification()
+        return verified['checks'] >= TRUST_MIN_CHECKS and verified['mismatches'] == 0
+
+    def record_verification(self, checks, mismatches):
+        with _verify_lock:
+            verified = self.verification()
+            verified['checks'] += int(checks)
+            verified['mismatches'] += int(mismatches)
+            tmp_path = f"{verification_path(self.path)}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(verified, f)
+            os.replace(tmp_path, verification_path(self.path))
+        return verified
+
+    def summary(self):
+        pairs = self.n * (self.n - 1)
+        always = int(np.unpackbits(self.always)[:self.n * self.n].sum())
+        never = int(np.unpackbits(self.never)[:self.n * self.n].sum())
+        if pairs == 0:
+            return f"{self.n} cells"
+        verified = self.verification()
+        return (f"{self.n} cells, {always / pairs:.1%} always visible, {never / pairs:.1%} never visible, "
+                f"{(pairs - always - never) / pairs:.1%} mixed; verified on {verified['checks']} checks with "
+                f"{verified['mismatches']} wrong ({'trusted' if self.trusted else 'not trusted'} in exact runs)")
+
+
+class PVSVisibility:
+    # drop-in for VisibilityChecker.is_visible that only raycasts mixed cell pairs;
+    # with verify=True it still raycasts everything and counts where the grid was wrong
+    def __init__(self, vc, grid, verify=False):
+        self.vc = vc
+        self.grid = grid
+        self.verify = verify
+        self.queries = 0
+        self.avoided = 0
+        self.mismatches = 0
+
+    def is_visible(self, p1, p2):
+        self.queries += 1
+        decided = self.grid.lookup(p1, p2)
+        if decided is None:
+            return self.vc.is_visible(p1, p2)
+
+        self.avoided += 1
+        if not self.verify:
+            return decided
+        exact = self.vc.is_visible(p1, p2)
+        if exact != decided:
+            self.mismatches += 1
+        return exact
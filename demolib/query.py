@@ -0,0 +1,22 @@
+import time
+
+from demolib.tables import TABLES, table_files, table_glob
+
+
+def connect():
+    import duckdb
+
+    con = duckdb.connect()
+    for table in TABLES:
+        if not table_files(table):
+            continue
+        pattern = table_glob(table).replace("\\", "/").replace("'", "''")
+        con.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{pattern}', hive_partitioning = true)")
+    return con
+
+
+def run_query(sql, params=None, con=None):
+    con = con or connect()
+    start = time.perf_counter()
+    result = con.execute(sql, params or []).df()
+    return result, time.perf_counter() - start
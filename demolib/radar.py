@@ -0,0 +1,61 @@
+import numpy as np
+
+RADAR_UNITS = 1024
+
+
+
+def _from_overview(pos_x, pos_y, scale):
+    # the game's overview files (and awpy's map data) give the top-left corner
+    return {"origin_x": float(pos_x), "origin_y": float(pos_y) - RADAR_UNITS * scale, "scale": float(scale)}
+
+
+# origin is the world position of the radar's bottom-left corner, scale is world units per radar pixel
+RADAR_TRANSFORMS = {
+    "cs_italy": _from_overview(-2647, 2592, 4.6),
+    "cs_office": _from_overview(-1838, 1858, 4.1),
+    "de_ancient": _from_overview(-2953, 2164, 5.0),
+    "de_anubis": _from_overview(-2796, 3328, 5.22),
+    "de_dust2": _from_overview(-2476, 3239, 4.4),
+    "de_inferno": _from_overview(-2087, 3870, 4.9),
+    # matches map_anim.r's hand-fitted transform
+    "de_mirage": {"origin_x": -3240.0, "origin_y": -3410.0, "scale": 5.02},
+    "de_nuke": _from_overview(-3453, 2887, 7.0),
+    "de_overpass": _from_overview(-4831, 1781, 5.2),
+    "de_train": _from_overview(-2308, 2078, 4.082077),
+    "de_vertigo": _from_overview(-3168, 1762, 4.0),
+}
+
+
+def _awpy_transform(map_name):
+    # maps missing above fall back to awpy's map data (fetched with `awpy get maps`)
+    try:
+        from awpy.data.map_data import MAP_DATA
+    except ImportError:
+        return None
+    if map_name not in MAP_DATA:
+        return None
+    data = MAP_DATA[map_name]
+    return _from_overview(data["pos_x"], data["pos_y"], data["scale"])
+
+
+def radar_transform(map_name):
+    if map_name not in RADAR_TRANSFORMS:
+        transform = _awpy_transform(map_name)
+        if transform is None:
+            raise KeyError(f"No radar transform registered for {map_name}")
+        RADAR_TRANSFORMS[map_name] = transform
+    return RADAR_TRANSFORMS[map_name]
+
+
+def world_to_radar(x, y, map_name, size):
+    transform = radar_transform(map_name)
+    k = size / RADAR_UNITS
+    px = (np.asarray(x, dtype=np.float64) - transform["origin_x"]) / transform["scale"] * k
+    py = size - (np.asarray(y, dtype=np.float64) - transform["origin_y"]) / transform["scale"] * k
+    return px, py
+
+
+def view_line_ends(px, py, yaw, length):
+    # image rows grow downwards, so a positive yaw moves the end point up
+    yaw_rad = np.radians(np.asarray(yaw, dtype=np.float64))
+    return px + length * np.cos(yaw_rad), py - length * np.sin(yaw_rad)
@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class RoundIndex:
+    # rows sorted by (round, player, tick) plus offset tables, so a round or one
+    # player's round is a contiguous slice instead of a boolean scan of the frame
+    def __init__(self, df, round_col="total_rounds_played", player_col="steamid"):
+        self.round_col = round_col
+        self.player_col = player_col
+        self.frame = df.sort_values([round_col, player_col, "tick"], kind="stable").reset_index(drop=True)
+
+        rounds = self.frame[round_col].to_numpy()
+        players = self.frame[player_col].to_numpy()
+        n = len(self.frame)
+
+        new_group = np.ones(n, dtype=bool)
+        new_group[1:] = (rounds[1:] != rounds[:-1]) | (players[1:] != players[:-1])
+        group_starts = np.flatnonzero(new_group)
+        group_ends = np.append(group_starts[1:], n)
+
+        new_round = np.ones(n, dtype=bool)
+        new_round[1:] = rounds[1:] != rounds[:-1]
+        round_starts = np.flatnonzero(new_round)
+        round_ends = np.append(round_starts[1:], n)
+
+        self._rounds = {rounds[s].item(): (int(s), int(e)) for s, e in zip(round_starts, round_ends)}
+        self._groups = {
+            (rounds[s].item(), players[s].item()): (int(s), int(e))
+            for s, e in zip(group_starts, group_ends)
+        }
+        self._player_rounds = {}
+        for round_num, player in self._groups:
+            self._player_rounds.setdefault(player, []).append(round_num)
+        self._arrays = {}
+
+    def rounds(self):
+        return list(self._rounds)
+
+    def player_rounds(self, player):
+        # rounds the player has rows in, ascending
+        return self._player_rounds.get(_key(player), [])
+
+    def round_bounds(self, round_num):
+        return self._rounds.get(_key(round_num), (0, 0))
+
+    def bounds(self, round_num, player):
+        return self._groups.get((_key(round_num), _key(player)), (0, 0))
+
+    def round(self, round_num):
+        start, end = self.round_bounds(round_num)
+        return self.frame.iloc[start:end]
+
+    def player_round(self, round_num, player):
+        start, end = self.bounds(round_num, player)
+        return self.frame.iloc[start:end]
+
+    def column(self, col, start, end):
+        # a zero-copy view of rows [start, end); each column is converted to numpy once
+        if col not in self._arrays:
+            self._arrays[col] = self.frame[col].to_numpy()
+        return self._arrays[col][start:end]
+
+
+def _key(value):
+    return value.item() if isinstance(value, np.generic) else value
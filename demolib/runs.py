@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from demolib.schema import LOAD_CHUNK_TICKS, concat_ticks, empty_ticks, iter_tick_chunks, load_ticks, peak_rss_bytes
+
+
+def _run_starts(df, columns):
+    # rows (sorted by steamid, then tick) where a new run begins
+    steamids = df['steamid'].to_numpy()
+    changed = np.ones(len(df), dtype=bool)
+    if len(df):
+        changed[1:] = steamids[1:] != steamids[:-1]
+        for col in columns:
+            codes, _ = pd.factorize(df[col], use_na_sentinel=True)
+            changed[1:] |= codes[1:] != codes[:-1]
+    return np.flatnonzero(changed)
+
+
+def encode_runs(tick_df, columns):
+    # one row per stretch of a player's rows where none of `columns` changes;
+    # n_ticks counts the rows folded in, so sums over runs match row counts
+    columns = [col for col in columns if col in tick_df.columns]
+    df = tick_df[['steamid', 'tick'] + columns].sort_values(['steamid', 'tick'], kind='stable')
+
+    n = len(df)
+    starts = _run_starts(df, columns)
+    ends = np.append(starts[1:], n)
+    ticks = df['tick'].to_numpy()
+
+    runs = df.iloc[starts][['steamid'] + columns].reset_index(drop=True)
+    runs.insert(1, 'start_tick', ticks[starts])
+    runs.insert(2, 'end_tick', ticks[ends - 1] if n else ticks[:0])
+    runs.insert(3, 'n_ticks', (ends - starts).astype(np.int32))
+    runs.attrs['rows'] = n
+    runs.attrs['rows_bytes'] = int(tick_df[['steamid'] + columns].memory_usage(deep=True).sum())
+    return runs
+
+
+def _merge_runs(runs, columns):
+    # runs of one player that only a chunk boundary split apart become one run again
+    runs = runs.sort_values(['steamid', 'start_tick'], kind='stable').reset_index(drop=True)
+    if len(runs) == 0:
+        return runs
+    starts = _run_starts(runs, columns)
+    ends = np.append(starts[1:], len(runs))
+    merged = runs.iloc[starts].reset_index(drop=True)
+    merged['end_tick'] = runs['end_tick'].to_numpy()[ends - 1]
+    merged['n_ticks'] = np.add.reduceat(runs['n_ticks'].to_numpy(), starts).astype(np.int32)
+    return merged
+
+
+def load_runs(parser, props, columns, chunk_ticks=LOAD_CHUNK_TICKS):
+    # parse and encode one chunk of ticks at a time, so only a chunk's rows and the runs
+    # so far are ever held; chunk_ticks=None parses the demo in one call instead
+    if chunk_ticks is None:
+        return encode_runs(load_ticks(parser, props), columns)
+
+    rows = 0
+    rows_bytes = 0
+    parts = []
+    for chunk in iter_tick_chunks(parser, props, chunk_ticks=chunk_ticks):
+        part = encode_runs(chunk, columns)
+        rows += part.attrs['rows']
+        rows_bytes += part.attrs['rows_bytes']
+        parts.append(part)
+
+    columns = [col for col in columns if col in props]
+    runs = _merge_runs(concat_ticks(parts), columns) if parts else encode_runs(empty_ticks(props), columns)
+    runs.attrs = {'rows': rows, 'rows_bytes': rows_bytes}
+    return runs
+
+
+def runs_report(runs):
+    rows_bytes = runs.attrs.get('rows_bytes', 0)
+    runs_bytes = int(runs.memory_usage(deep=True).sum())
+    ratio = rows_bytes / runs_bytes if runs_bytes else float('inf')
+    report = f"Runs: {len(runs)} runs for {runs.attrs.get('rows', 0)} rows, {rows_bytes / 1024 ** 2:.1f} MB -> {runs_bytes / 1024 ** 2:.2f} MB ({ratio:.0f}x smaller)"
+    peak = peak_rss_bytes()
+    if peak is not None:
+        report += f" | Peak RSS: {peak / 1e6:.0f} MB"
+    return report
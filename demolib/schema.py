@@ -0,0 +1,159 @@
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+FLOAT_COLUMNS = ("X", "Y", "Z", "yaw", "pitch")
+CATEGORY_COLUMNS = ("name", "active_weapon_name", "team_num")
+INT_COLUMNS = ("tick", "total_rounds_played")
+LOAD_CHUNK_TICKS = 16384  # ticks per parse_ticks call when a caller opts into chunked loading
+MAX_LEADING_EMPTY_CHUNKS = 4
+
+
+def steamid_series(values):
+    # float64 cannot hold a 17-digit steamid, so never route it through to_numeric with NaNs
+    values = pd.Series(values)
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return values.astype("UInt64")
+    parsed = [
+        int(v) if isinstance(v, (int, np.integer)) or (isinstance(v, str) and v.isdigit()) or (isinstance(v, float) and v == v) else None
+        for v in values
+    ]
+    return pd.Series(pd.array(parsed, dtype="UInt64"), index=values.index)
+
+
+def compact_ticks(tick_df):
+    raw_bytes = int(tick_df.memory_usage(deep=True).sum())
+
+    for col in tick_df.columns:
+        if col in FLOAT_COLUMNS:
+            tick_df[col] = tick_df[col].astype(np.float32)
+        elif col in CATEGORY_COLUMNS:
+            tick_df[col] = tick_df[col].astype("category")
+        elif col in INT_COLUMNS:
+            tick_df[col] = tick_df[col].astype("Int32" if tick_df[col].isna().any() else np.int32)
+        elif col.startswith("is_"):
+            tick_df[col] = tick_df[col].astype("boolean" if tick_df[col].isna().any() else bool)
+
+    if "steamid" in tick_df.columns:
+        steamids = steamid_series(tick_df["steamid"]).fillna(0).astype(np.uint64)
+        codes, _ = pd.factorize(steamids, sort=True)
+        tick_df["steamid"] = steamids
+        tick_df["player"] = codes.astype(np.int32)
+
+    tick_df.attrs["raw_bytes"] = raw_bytes
+    return tick_df
+
+
+def concat_ticks(chunks):
+    # chunks from compact_ticks; categories are unioned so they stay categorical,
+    # and player codes are recomputed over the whole frame
+    raw_bytes = sum(chunk.attrs.get("raw_bytes", 0) for chunk in chunks)
+    chunks = [chunk for chunk in chunks if len(chunk)] or chunks[:1]
+    if len(chunks) == 1:
+        tick_df = chunks[0]
+    else:
+        for col in CATEGORY_COLUMNS:
+            if col in chunks[0].columns:
+                categories = union_categoricals([chunk[col] for chunk in chunks], ignore_order=True).categories
+                for chunk in chunks:
+                    chunk[col] = chunk[col].cat.set_categories(categories)
+        # column by column, popping each from the chunks, so the frame is never held twice
+        columns = list(chunks[0].columns)
+        tick_df = pd.DataFrame(
+            {col: pd.concat([chunk.pop(col) for chunk in chunks], ignore_index=True) for col in columns},
+            copy=False,
+        )
+        del chunks
+        for col in tick_df.columns:
+            if col.startswith("is_") and tick_df[col].dtype not in (bool, "boolean"):
+                tick_df[col] = tick_df[col].astype("boolean")
+            elif col in INT_COLUMNS and tick_df[col].dtype not in (np.int32, "Int32"):
+                tick_df[col] = tick_df[col].astype("Int32")
+        if "player" in tick_df.columns:
+            codes, _ = pd.factorize(tick_df["steamid"], sort=True)
+            tick_df["player"] = codes.astype(np.int32)
+
+    tick_df.attrs["raw_bytes"] = raw_bytes
+    return tick_df
+
+
+def _parse_chunk(parser, props, ticks):
+    return compact_ticks(pd.DataFrame(parser.parse_ticks(props, ticks=list(ticks))))
+
+
+def iter_tick_chunks(parser, props, ticks=None, chunk_ticks=LOAD_CHUNK_TICKS):
+    # compacted frames of up to chunk_ticks ticks each, in tick order; every chunk is its
+    # own parse_ticks call, so the raw float64/object frame never exists for the whole
+    # demo, but each call re-reads the demo
+    if ticks is not None:
+        ticks = list(ticks)
+        for start in range(0, len(ticks), chunk_ticks):
+            yield _parse_chunk(parser, props, ticks[start:start + chunk_ticks])
+        return
+
+    # the tick count is not known up front: walk ranges until one comes back
+    # empty after players have appeared
+    start = 0
+    seen_rows = False
+    while True:
+        chunk = _parse_chunk(parser, props, range(start, start + chunk_ticks))
+        start += chunk_ticks
+        if len(chunk):
+            seen_rows = True
+            yield chunk
+        elif seen_rows or start >= chunk_ticks * MAX_LEADING_EMPTY_CHUNKS:
+            return
+
+
+def empty_ticks(props):
+    return compact_ticks(pd.DataFrame(columns=["tick", "steamid"] + list(props)))
+
+
+def load_ticks(parser, props, ticks=None, chunk_ticks=None):
+    # one parse_ticks call by default. With chunk_ticks (e.g. LOAD_CHUNK_TICKS) each chunk
+    # is compacted before the next is parsed, trading about one extra parse of the demo
+    # per chunk for a lower peak
+    if chunk_ticks is None:
+        if ticks is None:
+            return compact_ticks(pd.DataFrame(parser.parse_ticks(props)))
+        return _parse_chunk(parser, props, ticks)
+
+    chunks = list(iter_tick_chunks(parser, props, ticks, chunk_ticks))
+    if not chunks:
+        return empty_ticks(props)
+    return concat_ticks(chunks)
+
+
+def widen_floats(df):
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(np.float64)
+    return df
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return getattr(psutil.Process().memory_info(), "peak_wset", None)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def memory_report(tick_df):
+    compact_bytes = int(tick_df.memory_usage(deep=True).sum())
+    raw_bytes = tick_df.attrs.get("raw_bytes", compact_bytes)
+    ratio = raw_bytes / compact_bytes if compact_bytes else 1.0
+
+    report = f"Tick frame memory: {raw_bytes / 1e6:.1f} MB -> {compact_bytes / 1e6:.1f} MB ({ratio:.1f}x smaller)"
+    peak = peak_rss_bytes()
+    if peak is not None:
+        report += f" | Peak RSS: {peak / 1e6:.0f} MB"
+    return report
@@ -0,0 +1,85 @@
+EYE_HEIGHT = 64
+SEARCH_STRATEGIES = ("linear", "exponential", "stride")
+DEFAULT_STRIDE = 8
+
+
+def find_spotted_tick(vc, ticks, att_pos, vic_pos, kill_tick, strategy="linear", strict=False, stride=DEFAULT_STRIDE):
+    # ticks run backwards from the kill; returns (spotted_tick, raycasts, linear_raycasts)
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Unknown spotted tick search strategy: {strategy}")
+
+    n = len(ticks)
+    if n == 0:
+        return kill_tick, 0, 0
+
+    cache = {}
+
+    def visible(i):
+        if i not in cache:
+            p1 = (att_pos[i, 0], att_pos[i, 1], att_pos[i, 2] + EYE_HEIGHT)
+            p2 = (vic_pos[i, 0], vic_pos[i, 1], vic_pos[i, 2] + EYE_HEIGHT)
+            cache[i] = vc.is_visible(p1, p2)
+        return cache[i]
+
+    if strategy == "linear":
+        first_hidden = _linear_search(visible, 0, n)
+    elif strategy == "exponential":
+        first_hidden = _exponential_search(visible, n)
+    else:
+        first_hidden = _stride_search(visible, n, stride)
+
+    if strict and strategy != "linear":
+        # a coarse search only probes some ticks, so re-walk everything between
+        # the kill and the transition it found; cached probes are not recast
+        first_hidden = _linear_search(visible, 0, first_hidden)
+
+    if first_hidden < n:
+        spotted_tick = int(ticks[first_hidden]) + 1
+        linear_raycasts = first_hidden + 1
+    else:
+        spotted_tick = int(ticks[n - 1])
+        linear_raycasts = n
+
+    return spotted_tick, len(cache), linear_raycasts
+
+
+def _linear_search(visible, start, end):
+    for i in range(start, end):
+        if not visible(i):
+            return i
+    return end
+
+
+def _exponential_search(visible, n):
+    if not visible(0):
+        return 0
+
+    lo = 0
+    step = 1
+    while True:
+        hi = min(lo + step, n - 1)
+        if hi == lo:
+            return n
+        if not visible(hi):
+            break
+        lo = hi
+        step *= 2
+
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if visible(mid):
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+
+def _stride_search(visible, n, stride):
+    prev = -1
+    for i in list(range(0, n, stride)) + [n - 1]:
+        if i <= prev:
+            continue
+        if not visible(i):
+            return _linear_search(visible, prev + 1, i + 1)
+        prev = i
+    return n
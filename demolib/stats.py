@@ -0,0 +1,41 @@
+import math
+
+Z_95 = 1.96
+
+
+class RunningStats:
+    # Welford's online mean/variance, so a batch run can report after every demo
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else float("nan")
+
+    @property
+    def sem(self):
+        return math.sqrt(self.variance / self.n) if self.n > 1 else float("nan")
+
+    def ci(self, z=Z_95):
+        return self.mean - z * self.sem, self.mean + z * self.sem
+
+
+def mean_diff_ci(a, b, z=Z_95):
+    # Welch-style normal interval for a.mean - b.mean
+    diff = a.mean - b.mean
+    if a.n < 2 or b.n < 2:
+        return diff, float("nan"), float("nan")
+    se = math.sqrt(a.variance / a.n + b.variance / b.n)
+    return diff, diff - z * se, diff + z * se
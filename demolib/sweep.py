@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+from demolib.engagements import checker_spec, worker_checker
+from demolib.spotting import EYE_HEIGHT
+
+SWEEP_PROPS = ["X", "Y", "Z", "yaw", "is_alive", "team_num", "total_rounds_played"]
+MOVE_THRESHOLD = 16.0  # units either player may move before a pair's line of sight is recast
+MAX_STALE_TICKS = 64  # recast a pair at least this often even if nobody moved
+FOV_HALF_ANGLE = 45.0
+PLAYING_TEAMS = (2, 3)
+RAY_CHUNK = 4096  # rays per pool task
+
+
+def round_arrays(round_df):
+    # pivot one round to (tick, player) arrays; a player with no row at a tick counts as dead
+    ticks, tick_pos = np.unique(round_df['tick'].to_numpy(np.int64), return_inverse=True)
+    players, slot = np.unique(round_df['steamid'].to_numpy(np.uint64), return_inverse=True)
+    shape = (len(ticks), len(players))
+
+    pos = np.full(shape + (3,), np.nan)
+    pos[tick_pos, slot] = round_df[['X', 'Y', 'Z']].to_numpy(np.float64)
+    yaw = np.zeros(shape)
+    yaw[tick_pos, slot] = round_df['yaw'].to_numpy(np.float64)
+    alive = np.zeros(shape, dtype=bool)
+    alive[tick_pos, slot] = round_df['is_alive'].fillna(False).to_numpy(bool)
+    team = np.zeros(shape, dtype=np.int8)
+    team[tick_pos, slot] = pd.to_numeric(round_df['team_num'].astype(object), errors='coerce').fillna(0).to_numpy(np.int8)
+    return ticks, players, pos, yaw, alive, team
+
+
+def recast_schedule(ticks, pos, alive, team, move_threshold=MOVE_THRESHOLD, max_stale_ticks=MAX_STALE_TICKS):
+    # which enemy pairs need a fresh raycast at which tick. Line of sight depends only on
+    # positions, so the schedule never needs a ray result and the whole match's rays can be
+    # cast as one batch; returns (active, rows, pairs) with one (row, pair) per ray
+    a, b = np.triu_indices(pos.shape[1], k=1)
+    playing = np.isin(team, PLAYING_TEAMS)
+    active = alive[:, a] & alive[:, b] & playing[:, a] & playing[:, b] & (team[:, a] != team[:, b])
+
+    checked_a = np.full((len(a), 3), np.nan)
+    checked_b = np.full((len(a), 3), np.nan)
+    checked_tick = np.zeros(len(a), dtype=np.int64)
+    rows = []
+    pairs = []
+
+    for i in range(len(ticks)):
+        live = active[i]
+        if not live.any():
+            checked_a[:] = np.nan
+            continue
+
+        # NaN (never checked, or the pair dropped out) compares False and forces a recast
+        moved_a = np.sqrt(((pos[i, a] - checked_a) ** 2).sum(axis=1))
+        moved_b = np.sqrt(((pos[i, b] - checked_b) ** 2).sum(axis=1))
+        fresh = (moved_a <= move_threshold) & (moved_b <= move_threshold) & (ticks[i] - checked_tick < max_stale_ticks)
+        recast = np.flatnonzero(live & ~fresh)
+
+        checked_a[recast] = pos[i, a[recast]]
+        checked_b[recast] = pos[i, b[recast]]
+        checked_tick[recast] = ticks[i]
+        checked_a[~live] = np.nan
+        rows.append(np.full(len(recast), i))
+        pairs.append(recast)
+
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    pairs = np.concatenate(pairs) if pairs else np.zeros(0, dtype=np.int64)
+    return active, rows, pairs
+
+
+def schedule_rays(pos, rows, pairs):
+    # eye-to-eye segments as (n, 6) rows of start xyz, end xyz
+    a, b = np.triu_indices(pos.shape[1], k=1)
+    rays = np.concatenate([pos[rows, a[pairs]], pos[rows, b[pairs]]], axis=1)
+    rays[:, [2, 5]] += EYE_HEIGHT
+    return rays
+
+
+def _cast_rays(vc, rays):
+    return np.array([vc.is_visible(tuple(ray[:3]), tuple(ray[3:])) for ray in rays], dtype=bool)
+
+
+def _cast_chunk(args):
+    spec, rays = args
+    return _cast_rays(worker_checker(*spec), rays)
+
+
+def cast_rays(vc, rays, tri_path=None, pool=None):
+    # identical segments (players holding still, stale rechecks) are cast once; the rest go
+    # to the pool in chunks when there is one, where each worker keeps its own checker per map
+    if len(rays) == 0:
+        return np.zeros(0, dtype=bool), 0
+    unique_rays, inverse = np.unique(rays, axis=0, return_inverse=True)
+    if pool is None:
+        visible = _cast_rays(vc, unique_rays)
+    else:
+        spec = checker_spec(vc, tri_path)
+        tasks = [(spec, unique_rays[i:i + RAY_CHUNK]) for i in range(0, len(unique_rays), RAY_CHUNK)]
+        visible = np.concatenate(list(pool.map(_cast_chunk, tasks)))
+    return visible[inverse.ravel()], len(unique_rays)
+
+
+def round_onsets(ticks, players, pos, yaw, active, rows, pairs, visible, fov_half_angle=FOV_HALF_ANGLE):
+    # each pair keeps its last cast result until its next recast; then the FOV test and
+    # onset detection run over the whole round at once
+    a, b = np.triu_indices(len(players), k=1)
+    n_pairs = len(a)
+
+    result = np.zeros(active.shape, dtype=bool)
+    result[rows, pairs] = visible
+    last = np.full(active.shape, -1)
+    last[rows, pairs] = rows
+    last = np.maximum.accumulate(last, axis=0)
+    los = result[np.maximum(last, 0), np.arange(n_pairs)] & (last >= 0) & active
+
+    # directed pairs: observer sees target when there is line of sight and the target is in the observer's FOV
+    observer = np.concatenate([a, b])
+    target = np.concatenate([b, a])
+    dx = pos[:, target, 0] - pos[:, observer, 0]
+    dy = pos[:, target, 1] - pos[:, observer, 1]
+    view_angle = np.degrees(np.arctan2(dy, dx)) - yaw[:, observer]
+    view_angle = np.abs((view_angle + 180) % 360 - 180)
+    seen = np.concatenate([los, los], axis=1) & (view_angle <= fov_half_angle)
+
+    # each run of seen ticks per directed pair becomes one onset row; a gap in the ticks
+    # (freeze time or a timeout filtered out) ends the run
+    contiguous = np.zeros(len(ticks), dtype=bool)
+    contiguous[1:] = np.diff(ticks) == 1
+    continues_from_prev = np.zeros_like(seen)
+    continues_from_prev[1:] = seen[:-1] & contiguous[1:, None]
+    continues_to_next = np.zeros_like(seen)
+    continues_to_next[:-1] = seen[1:] & contiguous[1:, None]
+    pair, start = np.nonzero((seen & ~continues_from_prev).T)
+    _, stop = np.nonzero((seen & ~continues_to_next).T)
+    stop = stop + 1
+    partner = (pair + n_pairs) % (2 * n_pairs)
+
+    distance = np.sqrt(((pos[start, target[pair]] - pos[start, observer[pair]]) ** 2).sum(axis=1))
+    onsets = pd.DataFrame({
+        'tick': ticks[start],
+        'end_tick': ticks[stop - 1],
+        'observer_steamid': players[observer[pair]],
+        'target_steamid': players[target[pair]],
+        'distance': distance.astype(np.float32),
+        'view_angle': view_angle[start, pair].astype(np.float32),
+        'mutual': seen[start, partner],
+    })
+    return onsets
+
+
+def sweep_match(tick_df, vc, tri_path=None, pool=None, round_col="total_rounds_played", move_threshold=MOVE_THRESHOLD,
+                max_stale_ticks=MAX_STALE_TICKS, fov_half_angle=FOV_HALF_ANGLE):
+    # tick_df must already be limited to live play: warmup shares round 0 with the first
+    # round and respawns freely. Every round is scheduled first, then all of the match's
+    # rays are cast as one batch, then onsets are found per round;
+    # returns (onsets_df, pair_ticks, raycasts)
+    rounds = []
+    rays = []
+    for round_num, round_df in tick_df.groupby(round_col, sort=True):
+        ticks, players, pos, yaw, alive, team = round_arrays(round_df)
+        active, rows, pairs = recast_schedule(ticks, pos, alive, team, move_threshold, max_stale_ticks)
+        rounds.append((round_num, ticks, players, pos, yaw, active, rows, pairs))
+        rays.append(schedule_rays(pos, rows, pairs))
+
+    rays = np.concatenate(rays) if rays else np.zeros((0, 6))
+    visible, raycasts = cast_rays(vc, rays, tri_path, pool)
+
+    frames = []
+    pair_ticks = 0
+    offset = 0
+    for round_num, ticks, players, pos, yaw, active, rows, pairs in rounds:
+        round_visible = visible[offset:offset + len(rows)]
+        offset += len(rows)
+        onsets = round_onsets(ticks, players, pos, yaw, active, rows, pairs, round_visible, fov_half_angle)
+        onsets.insert(0, 'round', np.int32(round_num))
+        frames.append(onsets)
+        pair_ticks += int(active.sum())
+
+    onsets = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    onsets.attrs['scheduled_rays'] = len(rays)
+    return onsets, pair_ticks, raycasts
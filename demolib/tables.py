@@ -0,0 +1,46 @@
+import glob
+import os
+
+from demolib.paths import CACHE_DIR, cache_path, demo_stem
+from demolib.schema import steamid_series
+
+TABLES = ("ticks", "kills", "fires", "hurts", "engagements", "visibility_onsets")
+ROW_GROUP_SIZE = 64_000
+
+
+def table_path(table, demo_file, map_name):
+    # hive-style map=/demo= directories let the query layer prune whole files
+    return cache_path("tables", table, f"map={map_name}", f"demo={demo_stem(demo_file)}", "part.parquet")
+
+
+def table_glob(table):
+    return os.path.join(CACHE_DIR, "tables", table, "*", "*", "*.parquet")
+
+
+def has_table(table, demo_file, map_name):
+    return os.path.exists(table_path(table, demo_file, map_name))
+
+
+def write_table(table, df, demo_file, map_name):
+    if table not in TABLES:
+        raise ValueError(f"Unknown table: {table}")
+
+    df = df.drop(columns=[c for c in ("map", "demo") if c in df.columns])
+    steamid_cols = [c for c in df.columns if c.endswith("steamid")]
+    for col in steamid_cols:
+        df[col] = steamid_series(df[col])
+
+    # sorted steamids give tight row-group min/max stats for steamid predicates
+    sort_cols = steamid_cols[:1] + (["tick"] if "tick" in df.columns else [])
+    if sort_cols:
+        df = df.sort_values(sort_cols)
+
+    path = table_path(table, demo_file, map_name)
+    tmp_path = path + ".tmp"
+    df.to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+    return path
+
+
+def table_files(table):
+    return sorted(glob.glob(table_glob(table)))
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from demolib.schema import compact_ticks, load_ticks
+
+
+def event_windows(event_ticks, lookback_ticks):
+    event_ticks = np.unique(np.asarray(event_ticks, dtype=np.int64))
+    if len(event_ticks) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    starts = np.maximum(event_ticks - lookback_ticks, 0)
+    lengths = event_ticks - starts + 1
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.unique(np.repeat(starts, lengths) + offsets)
+
+
+def parse_ticks_windowed(parser, props, event_ticks, lookback_ticks):
+    wanted_ticks = event_windows(event_ticks, lookback_ticks)
+    if len(wanted_ticks) == 0:
+        return compact_ticks(pd.DataFrame(columns=["tick", "steamid"] + list(props)))
+
+    return load_ticks(parser, props, ticks=wanted_ticks.tolist())
+
+
+def strided_ticks(ticks, stride, keep_ticks=()):
+    # every stride-th tick (aligned to tick 0, the same ticks map_anim.r keeps) plus any keep ticks
+    ticks = np.unique(np.asarray(ticks, dtype=np.int64))
+    if stride <= 1:
+        return ticks
+    keep = np.isin(ticks, np.asarray(keep_ticks, dtype=np.int64))
+    return ticks[(ticks % stride == 0) | keep]
+
+
+def parse_ticks_strided(parser, props, ticks, stride=1, keep_ticks=()):
+    # rows for `ticks` only; stride 1 parses everything and filters, as the scripts did before
+    if stride <= 1:
+        tick_df = load_ticks(parser, props)
+        return tick_df[tick_df['tick'].isin(ticks)].copy()
+
+    wanted_ticks = strided_ticks(ticks, stride, keep_ticks)
+    if len(wanted_ticks) == 0:
+        return compact_ticks(pd.DataFrame(columns=["tick", "steamid"] + list(props)))
+
+    return load_ticks(parser, props, ticks=wanted_ticks.tolist())
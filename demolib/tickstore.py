@@ -0,0 +1,161 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from demolib.paths import cache_path, demo_stem
+
+STORE_COLUMNS = ("X", "Y", "Z")
+PLAYER_TABLE_DTYPE = np.dtype([
+    ("steamid", np.uint64),
+    ("first_tick", np.int32),
+    ("first_pos", np.int64),
+    ("n_pos", np.int64),
+    ("offset", np.int64),
+])
+
+
+def tick_store_path(demo_file, lookback_ticks=None):
+    suffix = "full" if lookback_ticks is None else f"w{lookback_ticks}"
+    return cache_path("tick_store", f"{demo_stem(demo_file)}.{suffix}")
+
+
+def build_tick_store(tick_df, path, columns=STORE_COLUMNS):
+    # one row per (player, axis tick) between the player's first and last tick,
+    # laid out player-major so any (player, tick range) is a contiguous slice
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    ticks = tick_df["tick"].to_numpy(np.int64)
+    steamids = tick_df["steamid"].to_numpy(np.uint64)
+
+    axis = np.unique(ticks)
+    pos = np.searchsorted(axis, ticks)
+    players, slot = np.unique(steamids, return_inverse=True)
+
+    first_pos = np.full(len(players), len(axis), dtype=np.int64)
+    last_pos = np.full(len(players), -1, dtype=np.int64)
+    np.minimum.at(first_pos, slot, pos)
+    np.maximum.at(last_pos, slot, pos)
+    n_pos = last_pos - first_pos + 1
+
+    table = np.zeros(len(players), dtype=PLAYER_TABLE_DTYPE)
+    table["steamid"] = players
+    table["first_tick"] = axis[first_pos]
+    table["first_pos"] = first_pos
+    table["n_pos"] = n_pos
+    table["offset"] = np.cumsum(n_pos) - n_pos
+
+    rows = table["offset"][slot] + pos - first_pos[slot]
+    total_rows = int(n_pos.sum())
+
+    valid = np.lib.format.open_memmap(os.path.join(tmp_path, "valid.npy"), mode="w+", dtype=bool, shape=(total_rows,))
+    valid[:] = False
+    valid[rows] = True
+    valid.flush()
+    del valid
+
+    for col in columns:
+        out = np.lib.format.open_memmap(os.path.join(tmp_path, f"{col}.npy"), mode="w+", dtype=np.float32, shape=(total_rows,))
+        out[:] = np.nan
+        out[rows] = tick_df[col].to_numpy(np.float32)
+        out.flush()
+        del out
+
+    # pos_ceil[t - axis[0]] is the first axis position whose tick is >= t
+    span = np.arange(axis[0], axis[-1] + 2) if len(axis) else np.empty(0, dtype=np.int64)
+    np.save(os.path.join(tmp_path, "axis.npy"), axis.astype(np.int32))
+    np.save(os.path.join(tmp_path, "pos_ceil.npy"), np.searchsorted(axis, span).astype(np.int32))
+    np.save(os.path.join(tmp_path, "players.npy"), table)
+    with open(os.path.join(tmp_path, "columns.json"), "w") as f:
+        json.dump(list(columns), f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return TickStore(path)
+
+
+class TickStore:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "columns.json")) as f:
+            self.columns = json.load(f)
+
+        self.axis = np.load(os.path.join(path, "axis.npy"), mmap_mode="r")
+        self.pos_ceil = np.load(os.path.join(path, "pos_ceil.npy"), mmap_mode="r")
+        self.players = np.load(os.path.join(path, "players.npy"))
+        self.valid = np.load(os.path.join(path, "valid.npy"), mmap_mode="r")
+        self.data = {col: np.load(os.path.join(path, f"{col}.npy"), mmap_mode="r") for col in self.columns}
+
+        # kill events carry steamids as int, str or float depending on the script
+        self._slots = {}
+        for i, steamid in enumerate(self.players["steamid"]):
+            self._slots[int(steamid)] = i
+            self._slots[float(steamid)] = i
+
+    def slot(self, steamid):
+        if isinstance(steamid, str):
+            steamid = int(steamid) if steamid.isdigit() else None
+        return self._slots.get(steamid)
+
+    def _position(self, tick):
+        if len(self.axis) == 0:
+            return 0
+        idx = int(tick) - int(self.axis[0])
+        if idx <= 0:
+            return 0
+        if idx >= len(self.pos_ceil):
+            return len(self.axis)
+        return int(self.pos_ceil[idx])
+
+    def _rows(self, slot, lo, hi):
+        player = self.players[slot]
+        lo = max(lo, int(player["first_pos"]))
+        hi = min(hi, int(player["first_pos"] + player["n_pos"]))
+        start = int(player["offset"]) + lo - int(player["first_pos"])
+        return lo, hi, start
+
+    def window(self, steamid, start_tick, end_tick):
+        slot = self.slot(steamid)
+        if slot is None:
+            return None
+
+        lo, hi, start = self._rows(slot, self._position(start_tick), self._position(end_tick + 1))
+        if hi <= lo:
+            return self.axis[0:0], {col: self.data[col][0:0] for col in self.columns}, self.valid[0:0]
+
+        rows = slice(start, start + hi - lo)
+        return self.axis[lo:hi], {col: self.data[col][rows] for col in self.columns}, self.valid[rows]
+
+    def engagement(self, attacker_id, victim_id, start_tick, end_tick):
+        # same rows as an inner join of both players' alive ticks, newest first;
+        # None when either player has no alive tick in the window
+        att_slot = self.slot(attacker_id)
+        vic_slot = self.slot(victim_id)
+        if att_slot is None or vic_slot is None:
+            return None
+
+        lo = self._position(start_tick)
+        hi = self._position(end_tick + 1)
+        att_lo, att_hi, att_start = self._rows(att_slot, lo, hi)
+        vic_lo, vic_hi, vic_start = self._rows(vic_slot, lo, hi)
+        if att_hi <= att_lo or vic_hi <= vic_lo:
+            return None
+        if not self.valid[att_start:att_start + att_hi - att_lo].any() or not self.valid[vic_start:vic_start + vic_hi - vic_lo].any():
+            return None
+
+        lo = max(att_lo, vic_lo)
+        hi = min(att_hi, vic_hi)
+        if hi <= lo:
+            return np.empty(0, dtype=np.int32), np.empty((0, 3)), np.empty((0, 3))
+
+        att_rows = slice(att_start + lo - att_lo, att_start + hi - att_lo)
+        vic_rows = slice(vic_start + lo - vic_lo, vic_start + hi - vic_lo)
+        both = self.valid[att_rows] & self.valid[vic_rows]
+
+        ticks = self.axis[lo:hi][both][::-1]
+        att_pos = np.stack([self.data[col][att_rows][both] for col in ("X", "Y", "Z")], axis=1)[::-1].astype(np.float64)
+        vic_pos = np.stack([self.data[col][vic_rows][both] for col in ("X", "Y", "Z")], axis=1)[::-1].astype(np.float64)
+        return ticks, att_pos, vic_pos
@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+from demoparser2 import DemoParser
+from awpy.visibility import VisibilityChecker
+from awpy.data import TRIS_DIR
+
+from demolib.archives import demo_key, find_demo, local_demo
+from demolib.engagements import analyze_kills, fire_ticks_by_player, kill_list
+from demolib.profiles import steamid_key
+from demolib.ticks import parse_ticks_windowed
+from demolib.tickstore import TickStore, build_tick_store, tick_store_path
+
+WORKER_HOST = "127.0.0.1"
+WORKER_PORT = 8765
+ANALYSES = ("kill_speed", "reaction", "kills")
+TICK_RATE = 64
+LOOKBACK_WINDOW_SECONDS = 3.0
+MAX_KILL_SPEED_TICKS = 150
+MAX_REACTION_TICKS = 200
+RESULT_CACHE_SIZE = 64
+
+_checkers = {}
+_checkers_lock = threading.Lock()
+_results = {}
+_results_lock = threading.Lock()
+_store_lock = threading.Lock()
+
+
+def checker(map_name):
+    # one VisibilityChecker per map for the life of the worker
+    with _checkers_lock:
+        if map_name not in _checkers:
+            tri_path = TRIS_DIR / f"{map_name}.tri"
+            if not tri_path.exists():
+                raise FileNotFoundError(f".tri file for {map_name} not found")
+            _checkers[map_name] = VisibilityChecker(path=tri_path)
+        return _checkers[map_name]
+
+
+def _summary(values):
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return {'n': 0}
+    return {'n': int(len(values)), 'mean_ms': float(values.mean()), 'median_ms': float(np.median(values))}
+
+
+def _timing_result(samples, tracked):
+    per_player = {str(steamid): _summary(values) for steamid, values in samples.items()}
+    tracked_values = [v for steamid, values in samples.items() if steamid in tracked for v in values]
+    other_values = [v for steamid, values in samples.items() if steamid not in tracked for v in values]
+    return {'per_player': per_player, 'tracked': _summary(tracked_values), 'other': _summary(other_values)}
+
+
+def _engagements(parser, demo_path, kills_df, map_name, need_fires):
+    lookback_ticks = int(LOOKBACK_WINDOW_SECONDS * TICK_RATE)
+    store_path = tick_store_path(demo_key(demo_path), lookback_ticks)
+    with _store_lock:
+        if os.path.exists(store_path):
+            store = TickStore(store_path)
+        else:
+            tick_df = parse_ticks_windowed(parser, ["X", "Y", "Z", "is_alive", "name"], kills_df.get('tick', []), lookback_ticks)
+            store = build_tick_store(tick_df[tick_df['is_alive'] == True], store_path)
+
+    fires = fire_ticks_by_player(pd.DataFrame(parser.parse_event("weapon_fire"))) if need_fires else None
+    return analyze_kills(kill_list(kills_df), store, checker(map_name), lookback_ticks, fires)
+
+
+def analyze_demo(path, analyses=ANALYSES, tracked=()):
+    unknown = [a for a in analyses if a not in ANALYSES]
+    if unknown:
+        raise ValueError(f"Unknown analyses: {', '.join(unknown)}")
+    demo_path = find_demo(path)
+    if demo_path is None:
+        raise FileNotFoundError(f"{path} not found")
+
+    stat = os.stat(demo_path)
+    tracked = {steamid_key(str(t)) for t in tracked}
+    key = (os.path.abspath(demo_path), stat.st_size, stat.st_mtime_ns, tuple(sorted(analyses)), tuple(sorted(tracked)))
+    with _results_lock:
+        if key in _results:
+            return {**_results[key], 'cached': True}
+
+    start = time.perf_counter()
+    parser = DemoParser(local_demo(demo_path))
+    map_name = parser.parse_header().get("map_name")
+    kills_df = pd.DataFrame(parser.parse_event("player_death"))
+    demo_file = os.path.basename(path)
+    result = {'demo': demo_file, 'map': map_name, 'kills_total': len(kills_df)}
+
+    if "kills" in analyses and len(kills_df) > 0:
+        per_player = {}
+        for steamid, group in kills_df.groupby(kills_df['attacker_steamid'].astype(str)):
+            if steamid_key(steamid) is None:
+                continue
+            per_player[steamid] = {
+                'kills': int(len(group)),
+                'headshot_ratio': float(group['headshot'].astype(float).mean()),
+                'thrusmoke_ratio': float(group['thrusmoke'].astype(float).mean()),
+            }
+        result['kills'] = {'per_player': per_player}
+
+    if "kill_speed" in analyses or "reaction" in analyses:
+        engagements = _engagements(parser, demo_path, kills_df, map_name, "reaction" in analyses)
+        kill_speed = {}
+        reaction = {}
+        for engagement in engagements:
+            attacker = steamid_key(engagement['attacker_steamid'])
+            if attacker is None:
+                continue
+            kill_speed_ticks = engagement['tick'] - engagement['spotted_tick']
+            if kill_speed_ticks <= MAX_KILL_SPEED_TICKS:
+                kill_speed.setdefault(attacker, []).append(kill_speed_ticks / TICK_RATE * 1000)
+            if engagement['first_shot_tick'] is not None:
+                reaction_ticks = engagement['first_shot_tick'] - engagement['spotted_tick']
+                if 0 <= reaction_ticks <= MAX_REACTION_TICKS:
+                    reaction.setdefault(attacker, []).append(reaction_ticks / TICK_RATE * 1000)
+        if "kill_speed" in analyses:
+            result['kill_speed'] = _timing_result(kill_speed, tracked)
+        if "reaction" in analyses:
+            result['reaction'] = _timing_result(reaction, tracked)
+
+    result['compute_seconds'] = time.perf_counter() - start
+    with _results_lock:
+        if len(_results) >= RESULT_CACHE_SIZE:
+            _results.pop(next(iter(_results)))
+        _results[key] = result
+    return {**result, 'cached': False}
+
+
+class WorkerHandler(BaseHTTPRequestHandler):
+    started = time.time()
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send(404, {'error': f"unknown path {self.path}"})
+            return
+        with _checkers_lock:
+            maps = sorted(_checkers)
+        self._send(200, {'status': 'ok', 'uptime_seconds': time.time() - self.started, 'maps': maps, 'cached_results': len(_results)})
+
+    def do_POST(self):
+        if self.path != "/analyze":
+            self._send(404, {'error': f"unknown path {self.path}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            result = analyze_demo(request['demo'], request.get('analyses', ANALYSES), request.get('tracked', ()))
+        except (KeyError, ValueError, FileNotFoundError) as e:
+            self._send(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self._send(200, result)
+
+    def log_message(self, format, *args):
+        print(f"  [{self.log_date_time_string()}] {format % args}")
+
+
+def serve(host=WORKER_HOST, port=WORKER_PORT, preload_maps=()):
+    for map_name in preload_maps:
+        print(f"Loading geometry for {map_name}...")
+        checker(map_name)
+    server = ThreadingHTTPServer((host, port), WorkerHandler)
+    print(f"Analysis worker listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,41 @@
+import sys
+import pandas as pd
+
+from demolib.profiles import ProfileStore
+
+SKETCH_METRICS = ["kill_speed_ms", "reaction_ms"]
+
+def summary_row(profile):
+    row = {key: value for key, value in profile.items() if not isinstance(value, dict)}
+    for metric in SKETCH_METRICS:
+        if metric in profile:
+            row[f"{metric}_n"] = profile[metric]['n']
+            row[f"{metric}_median"] = profile[metric]['median']
+    return row
+
+def main():
+    with ProfileStore() as profiles:
+        if len(sys.argv) > 1:
+            for steamid in sys.argv[1:]:
+                profile = profiles.profile(steamid)
+                print(f"\n{'='*60}")
+                print(f"Profile for {steamid}")
+                print(f"{'='*60}")
+                if profile is None:
+                    print("  No history recorded")
+                    continue
+                for key, value in profile.items():
+                    if isinstance(value, dict):
+                        print(f"  {key}: " + ", ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in value.items()))
+                    elif key != 'steamid':
+                        print(f"  {key}: {value:g}")
+            return
+
+        rows = [summary_row(profiles.profile(steamid)) for steamid in profiles.steamids()]
+        if not rows:
+            print("No profiles recorded yet")
+            return
+        print(pd.DataFrame(rows).round(3).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+from demolib.query import run_query
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python query.py \"SELECT ...\" | query.sql")
+        return
+    
+    sql = sys.argv[1]
+    if sql.endswith(".sql") and os.path.exists(sql):
+        with open(sql) as f:
+            sql = f.read()
+    
+    result, elapsed = run_query(sql)
+    print(result.to_string(index=False))
+    print(f"\n{len(result)} rows in {elapsed * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()